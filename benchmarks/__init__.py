@@ -0,0 +1 @@
+"""Performance benchmarks for the kobo_automation engines."""
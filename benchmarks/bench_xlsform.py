@@ -0,0 +1,85 @@
+"""
+Benchmark the XLSForm generator on synthetic questionnaires.
+
+    python -m benchmarks.bench_xlsform --sizes 100 500 1000 5000
+
+For every size a .docx is generated once (not timed) and then parsed, emitted and
+written `--repeat` times. The best time of each stage and the peak traced memory
+of the whole pipeline are reported.
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from io import BytesIO
+
+from benchmarks.synthetic_questionnaire import write_synthetic_docx
+from kobo_automation.xlsform import build_xlsform, read_docx_lines, tokenize_lines, write_xlsform
+
+DEFAULT_SIZES = [100, 500, 1000, 2500, 5000]
+CODING_MODE = "P1, P2, P3, ..."
+ROSTER = [{"list_name": "anketuesit_list", "name": str(i), "label": f"Anketuesi {i}"} for i in range(1, 301)]
+
+
+def run_pipeline(docx_path):
+    """Parse, emit and write one questionnaire; returns per-stage seconds and form size."""
+    started = time.perf_counter()
+    tokens = tokenize_lines(read_docx_lines(docx_path))
+    parsed = time.perf_counter()
+    form = build_xlsform(tokens, CODING_MODE, anketuesit_choices=ROSTER)
+    emitted = time.perf_counter()
+    output = BytesIO()
+    write_xlsform(output, form["survey"], form["choices"], form["settings"])
+    written = time.perf_counter()
+    return {
+        "parse": parsed - started,
+        "emit": emitted - parsed,
+        "write": written - emitted,
+        "survey_rows": len(form["survey"]),
+        "choice_rows": len(form["choices"]),
+        "xlsx_bytes": output.tell(),
+    }
+
+
+def bench_size(n_questions, repeat, max_options, workdir):
+    docx_path = write_synthetic_docx(os.path.join(workdir, f"synthetic_{n_questions}.docx"), n_questions, max_options)
+
+    runs = [run_pipeline(docx_path) for _ in range(repeat)]
+
+    # Peak memory is measured on a separate run so tracing does not skew the timings
+    tracemalloc.start()
+    run_pipeline(docx_path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {stage: min(run[stage] for run in runs) for stage in ("parse", "emit", "write")}
+    result.update({key: runs[0][key] for key in ("survey_rows", "choice_rows", "xlsx_bytes")})
+    result["questions"] = n_questions
+    result["peak_mb"] = peak / 1_000_000
+    return result
+
+
+def format_row(result):
+    return (
+        f"{result['questions']:>9} {result['survey_rows']:>8} {result['choice_rows']:>8} "
+        f"{result['parse'] * 1000:>10.1f} {result['emit'] * 1000:>10.1f} {result['write'] * 1000:>10.1f} "
+        f"{result['peak_mb']:>9.1f} {result['xlsx_bytes'] / 1000:>9.0f}"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="question counts to benchmark")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per size (best is reported)")
+    parser.add_argument("--max-options", type=int, default=30, help="longest option list per question")
+    args = parser.parse_args(argv)
+
+    print(f"{'questions':>9} {'survey':>8} {'choices':>8} {'parse ms':>10} {'emit ms':>10} {'write ms':>10} {'peak MB':>9} {'xlsx KB':>9}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for n_questions in args.sizes:
+            print(format_row(bench_size(n_questions, args.repeat, args.max_options, workdir)), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Synthetic tagged .docx questionnaires for benchmarking the XLSForm generator.
+
+Questions cycle through every tag the generator understands, with option lists up
+to `max_options` long, so a corpus of N questions exercises the same paths as a
+real client questionnaire of that size.
+"""
+import random
+
+QUESTION_KINDS = ["single", "multiple", "matrix", "ranking", "scale", "numeric", "text", "note"]
+
+
+def synthetic_lines(n_questions, max_options=30, seed=0):
+    """Text lines of a questionnaire with `n_questions` tagged questions."""
+    rng = random.Random(seed)
+    lines = []
+    for q in range(1, n_questions + 1):
+        kind = QUESTION_KINDS[(q - 1) % len(QUESTION_KINDS)]
+        option_count = rng.randint(2, max_options)
+
+        if kind in ("single", "multiple"):
+            tags = f"[{kind}]" + (" [random]" if q % 5 == 0 else "")
+            lines.append(f"{q}. Pyetja {q} me zgjedhje? {tags}")
+            for o in range(1, option_count + 1):
+                # Every 7th option asks for an open "other" answer
+                suffix = " ______" if o % 7 == 0 else ""
+                lines.append(f"{o}. Opsioni {o} i pyetjes {q}{suffix}")
+        elif kind == "matrix":
+            columns = rng.randint(3, 7)
+            style = rng.choice(["single", "multiple"])
+            lines.append(f"{q}. Vlerësoni deklaratat e mëposhtme [matrix {style} {columns}]")
+            lines.extend(f"Kolona {c}" for c in range(1, columns + 1))
+            lines.extend(f"Deklarata {r} e pyetjes {q}" for r in range(1, option_count + 1))
+        elif kind == "ranking":
+            ranks = min(option_count, rng.randint(3, 10))
+            lines.append(f"{q}. Renditni sipas rëndësisë [ranking {ranks}]")
+            lines.extend(f"{o}. Alternativa {o}" for o in range(1, option_count + 1))
+        elif kind == "scale":
+            lines.append(f"{q}. Sa jeni të kënaqur? [scale 1(Aspak)-{rng.choice([5, 7, 10])}(Plotësisht)]")
+        elif kind == "note":
+            lines.append(f"[note] Seksioni {q}")
+        else:
+            lines.append(f"{q}. Pyetja e hapur {q} [{kind}] [hint: Shkruani përgjigjen]")
+    return lines
+
+
+def write_synthetic_docx(path, n_questions, max_options=30, seed=0):
+    """Save a synthetic questionnaire as a .docx, one paragraph per line."""
+    from docx import Document
+
+    doc = Document()
+    for line in synthetic_lines(n_questions, max_options, seed):
+        doc.add_paragraph(line)
+    doc.save(path)
+    return path
@@ -0,0 +1,43 @@
+"""
+Streamlit-independent engines behind the kobo-automatization pages.
+
+The pages are thin UI wrappers over these functions, so the same engines can be run
+from scripts, cron jobs or worker processes. Names are resolved on first access and
+heavy dependencies (docx2python, python-docx, openpyxl, google.generativeai, pymc,
+arviz) are imported inside the functions that need them.
+"""
+import importlib
+
+_EXPORTS = {
+    "generate_xlsform": "kobo_automation.xlsform",
+    "build_xlsform": "kobo_automation.xlsform",
+    "write_xlsform": "kobo_automation.xlsform",
+    "form_files": "kobo_automation.xlsform",
+    "generate_xlsform_bulk": "kobo_automation.xlsform",
+    "validate_xlsform": "kobo_automation.validate",
+    "lint_questionnaire": "kobo_automation.lint",
+    "lint_warnings": "kobo_automation.lint",
+    "compile_fragment": "kobo_automation.question_bank",
+    "estimate_form_cost": "kobo_automation.cost",
+    "translate_dataframe": "kobo_automation.translation",
+    "translate_dataframe_multi": "kobo_automation.translation",
+    "translate_docx_in_place": "kobo_automation.translation",
+    "translate_texts": "kobo_automation.translation",
+    "TranslationMemory": "kobo_automation.translation_memory",
+    "TranslationCheckpoint": "kobo_automation.translation_memory",
+    "patch_workbook": "kobo_automation.workbook",
+    "project_glossary": "kobo_automation.glossary",
+    "extract_from_docx_to_excel": "kobo_automation.extraction",
+    "categorize_column": "kobo_automation.categorize",
+    "simple_count_analysis": "kobo_automation.maxdiff",
+    "hierarchical_bayes_analysis": "kobo_automation.maxdiff",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(module), name)
@@ -0,0 +1,256 @@
+"""
+Categorization of open-ended survey responses with Gemini.
+
+Identical responses are sent once; every batch asks for one category per numbered
+response and the labels are fanned back out to all rows that share the text.
+"""
+import re
+import time
+from collections import Counter, OrderedDict
+
+from kobo_automation.gemini import generation_config
+
+DEFAULT_PROMPT = """You are a survey response categorizer. Your ONLY task is to assign exactly ONE category from the provided list to each survey response.
+
+Question: {question_label}
+
+Available categories (use these EXACT names — copy-paste, do not rephrase):
+{categories}
+
+CRITICAL RULES FOR CONSISTENCY:
+1. You MUST copy-paste category names EXACTLY as listed above. Do NOT paraphrase, abbreviate, reword, or create synonyms. For example, if the category is "Water supply", NEVER write "Water", "Water issues", "Water supply problems", or any variation.
+2. Two responses that express the same idea MUST receive the same category, even if they use different words. For example, "water is bad", "we need clean water", and "water supply is poor" should ALL get the same water-related category.
+3. When in doubt between two categories, choose the one that is MORE SPECIFIC to the response content.
+4. If a response does not clearly fit any category, assign it to "Other". Prefer "Other" over inventing new categories.
+5. If the response is empty, output: 999
+6. ONLY use "NEW: <short category name>" if the response represents a genuinely distinct theme that NONE of the existing categories can cover — this should be extremely rare.
+7. The output must be in {language}, even if the answers are in other languages.
+8. Output ONLY the category name per line — no explanation, no punctuation, no extra text.
+
+Responses (one per line, numbered):
+{responses}
+
+Output one category per line in the same order (numbered to match), e.g.:
+1. Category
+2. Category
+..."""
+
+MAX_RETRIES = 3
+SPECIAL_LABELS = ("999", "Error")
+
+
+def call_gemini_batch(model, prompt_text: str, on_retry=None) -> tuple[str, int, int]:
+    """Returns (text, input_tokens, output_tokens) with retry."""
+    for attempt in range(MAX_RETRIES):
+        try:
+            response = model.generate_content(
+                prompt_text,
+                generation_config=generation_config(
+                    max_output_tokens=4096,
+                    temperature=0,
+                ),
+                request_options={"timeout": 120},
+            )
+            in_tok = response.usage_metadata.prompt_token_count
+            out_tok = response.usage_metadata.candidates_token_count
+            return response.text.strip(), in_tok, out_tok
+        except Exception as e:
+            if attempt < MAX_RETRIES - 1:
+                wait = 2 ** attempt
+                if on_retry:
+                    on_retry(attempt + 1, wait, e)
+                time.sleep(wait)
+            else:
+                raise e
+
+
+def parse_batch_response(text: str, expected_count: int) -> list[str]:
+    """Parse numbered lines from model output. Handles multi-word categories."""
+    lines = [l.strip() for l in text.strip().splitlines() if l.strip()]
+    results = []
+    for line in lines:
+        # Match lines starting with a number (e.g. "1. Category name here")
+        m = re.match(r"^\d+[\.\)\-:]\s*(.+)$", line)
+        if m:
+            results.append(m.group(1).strip())
+        elif not re.match(r"^\d+$", line):
+            # Non-numbered, non-empty line — include as-is (fallback)
+            results.append(line.strip())
+    # Pad or truncate to match expected count
+    while len(results) < expected_count:
+        results.append("Error")
+    return results[:expected_count]
+
+
+def is_blank(value):
+    import pandas as pd
+
+    return pd.isna(value) or str(value).strip() == ""
+
+
+def categorize_column(
+    responses,
+    categories: list[str],
+    model,
+    prompt_template: str,
+    question_label: str,
+    language: str,
+    batch_size: int,
+    parent_responses=None,
+    parent_label=None,
+    token_counts=None,
+    on_start=None,
+    on_progress=None,
+    on_warning=None,
+    on_retry=None,
+) -> list[str]:
+    """
+    Assign one category to every response of a pandas Series.
+    Empty responses get "999" and failed batches "Error". For follow-up questions
+    `parent_responses` (aligned with `responses`) and `parent_label` give the model
+    the previous answer. Token usage is added to `token_counts` when given.
+    `on_start(total_unique, total_original, deduped, skipped)` is called once before
+    the first batch and `on_progress(done, total_unique)` after every batch.
+    """
+    cats_str = "\n".join(f"- {c}" for c in categories)
+
+    # Pre-fill results: mark nulls/empty as 999 immediately
+    results = [""] * len(responses)
+    non_empty_indices = []
+    for i, resp in enumerate(responses):
+        if is_blank(resp):
+            results[i] = "999"
+        else:
+            non_empty_indices.append(i)
+
+    if not non_empty_indices:
+        return results
+
+    def parent_answer(idx, strip):
+        parent_val = parent_responses.iloc[idx]
+        if is_blank(parent_val):
+            return "(no answer)"
+        return str(parent_val).strip() if strip else str(parent_val)
+
+    # --- Deduplication: categorize each unique response text only once ---
+    # Build a key for each response (includes parent answer for follow-ups)
+    def make_key(idx):
+        resp_text = str(responses.iloc[idx]).strip()
+        if parent_responses is not None:
+            return f"[{parent_answer(idx, True)}] {resp_text}"
+        return resp_text
+
+    # Map each unique key to the list of row indices that share it
+    unique_keys = OrderedDict()
+    for idx in non_empty_indices:
+        key = make_key(idx)
+        if key not in unique_keys:
+            unique_keys[key] = {"idx": idx, "rows": []}
+        unique_keys[key]["rows"].append(idx)
+
+    unique_list = list(unique_keys.items())  # [(key, {"idx": ..., "rows": [...]}), ...]
+    total_unique = len(unique_list)
+    total_original = len(non_empty_indices)
+    if on_start:
+        on_start(total_unique, total_original, total_original - total_unique, len(responses) - total_original)
+
+    num_batches = (total_unique + batch_size - 1) // batch_size
+    unique_labels = [""] * total_unique
+
+    if parent_responses is not None:
+        question_label = f"{question_label}\n(This is a follow-up to: \"{parent_label}\" — each response includes the respondent's previous answer in [brackets] for context.)"
+
+    for batch_idx in range(num_batches):
+        start = batch_idx * batch_size
+        end = min(start + batch_size, total_unique)
+        batch_items = unique_list[start:end]
+
+        numbered_responses = []
+        for j, (key, info) in enumerate(batch_items):
+            idx = info["idx"]
+            resp_text = str(responses.iloc[idx])
+            if parent_responses is not None:
+                numbered_responses.append(f"{j+1}. [Previous answer: {parent_answer(idx, False)}] {resp_text}")
+            else:
+                numbered_responses.append(f"{j+1}. {resp_text}")
+
+        prompt = prompt_template.format(
+            question_label=question_label,
+            categories=cats_str,
+            responses="\n".join(numbered_responses),
+            language=language,
+        )
+
+        try:
+            text, in_tok, out_tok = call_gemini_batch(model, prompt, on_retry=on_retry)
+            if token_counts is not None:
+                token_counts["input"] += in_tok
+                token_counts["output"] += out_tok
+            batch_labels = parse_batch_response(text, len(batch_items))
+        except Exception as e:
+            if on_warning:
+                on_warning(batch_idx + 1, e)
+            batch_labels = ["Error"] * len(batch_items)
+
+        for j in range(len(batch_items)):
+            unique_labels[start + j] = batch_labels[j]
+
+        if on_progress:
+            on_progress(end, total_unique)
+
+    # --- Map labels back: every duplicate row gets the same category ---
+    for i, (key, info) in enumerate(unique_list):
+        label = unique_labels[i]
+        for row_idx in info["rows"]:
+            results[row_idx] = label
+
+    return results
+
+
+def is_new_label(label):
+    return label.lower().startswith("new:")
+
+
+def promoted_categories(labels, threshold):
+    """'NEW: X' proposals that occur at least `threshold` times."""
+    new_counts = Counter(re.sub(r"(?i)^new:\s*", "", l).strip() for l in labels if is_new_label(l))
+    return [cat for cat, cnt in new_counts.items() if cnt >= threshold]
+
+
+def normalize_labels(labels):
+    """Drop 'NEW:' prefixes and trailing dots and merge case variants of the same category."""
+    # Clean up any remaining "NEW: X" labels
+    def clean_label(l):
+        m = re.match(r"(?i)^new:\s*(.+)$", l)
+        return m.group(1).strip() if m else l
+
+    labels = [clean_label(l) for l in labels]
+
+    # Normalize categories: strip trailing punctuation, then merge duplicates
+    # e.g. "Electricity." → "Electricity", deduped against "Electricity"
+    labels = [l if l in SPECIAL_LABELS else l.rstrip(".") for l in labels]
+
+    # Build a canonical mapping: for each lowercased name, keep the first seen form
+    canonical = {}
+    for l in labels:
+        if l in SPECIAL_LABELS:
+            continue
+        key = l.lower()
+        if key not in canonical:
+            canonical[key] = l
+    return [canonical.get(l.lower(), l) if l not in SPECIAL_LABELS else l for l in labels]
+
+
+def consolidate_labels(labels, max_categories):
+    """
+    Keep the top (max_categories - 1) categories and merge the rest into "Other".
+    Returns (labels, merge) where merge is (categories_found, categories_merged,
+    responses_merged), or None when nothing had to be merged.
+    """
+    label_counts = Counter(l for l in labels if l not in SPECIAL_LABELS)
+    if len(label_counts) <= max_categories:
+        return labels, None
+    top_cats = {cat for cat, _ in label_counts.most_common(max_categories - 1)}
+    merged_count = sum(cnt for cat, cnt in label_counts.items() if cat not in top_cats)
+    labels = [l if l in top_cats or l in SPECIAL_LABELS else "Other" for l in labels]
+    return labels, (len(label_counts), len(label_counts) - len(top_cats), merged_count)
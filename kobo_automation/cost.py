@@ -0,0 +1,139 @@
+"""
+On-device evaluation cost estimate for generated XLSForms.
+
+Collect and Enketo re-evaluate a field's relevant/constraint/calculation/
+choice_filter whenever a field it references changes, and redraw every row of a
+field-list page together. The score below is a rough proxy for that work, used to
+rank the fields worth simplifying before fieldwork.
+"""
+import csv
+import re
+from io import StringIO
+
+from kobo_automation.validate import REFERENCE_PATTERN, GROUP_TYPES, GROUP_ENDS, sheet_row
+
+EXPRESSION_COLUMNS = ["relevant", "constraint", "calculation", "choice_filter", "required", "repeat_count"]
+CONNECTIVE_PATTERN = re.compile(r"\b(?:and|or)\b")
+SELECT_PREFIXES = ("select_one ", "select_multiple ", "rank ")
+
+# Thresholds above which a row gets a note in the report
+MAX_CLAUSES = 10
+MAX_FAN_OUT = 10
+MAX_INLINE_CHOICES = 1000
+MAX_FIELD_LIST_REQUIRED = 10
+MAX_GROUP_DEPTH = 3
+
+COST_REPORT_COLUMNS = ["rreshti", "emri", "tipi", "kushtet", "referencat", "varesit", "opsionet", "pesha", "shenimet"]
+
+
+def expression_clauses(expression):
+    """Boolean terms of an XPath expression: `a and b or c` has 3."""
+    if not isinstance(expression, str) or not expression.strip():
+        return 0
+    if expression.strip() in ("yes", "no", "true", "false", "true()", "false()"):
+        return 0
+    return len(CONNECTIVE_PATTERN.findall(expression)) + 1
+
+
+def estimate_form_cost(survey, choices):
+    """
+    Score every survey row by the evaluation work it causes on a device.
+    Returns one dict per row with a non-zero score (row, name, type, clauses,
+    references, fan_out, choices, score, notes), the most expensive first.
+    """
+    list_sizes = {}
+    for choice in choices:
+        list_sizes[choice.get("list_name")] = list_sizes.get(choice.get("list_name"), 0) + 1
+
+    # Fields whose expressions read each field
+    dependents = {}
+    references = []
+    for row in survey:
+        refs = set()
+        for column in EXPRESSION_COLUMNS + ["label", "hint"]:
+            value = row.get(column)
+            if isinstance(value, str) and "${" in value:
+                refs.update(REFERENCE_PATTERN.findall(value))
+        references.append(refs)
+        for ref in refs:
+            dependents.setdefault(ref, set()).add(row.get("name"))
+
+    entries = []
+    open_groups = []
+    for index, row in enumerate(survey):
+        q_type = (row.get("type") or "").strip()
+        name = row.get("name")
+        notes = []
+
+        if q_type in GROUP_ENDS:
+            if open_groups:
+                group = open_groups.pop()
+                if group["field_list"] and group["required"] > MAX_FIELD_LIST_REQUIRED:
+                    group["entry"]["notes"].append(f"faqe field-list me {group['required']} fusha të detyrueshme")
+                    group["entry"]["score"] += group["required"]
+            continue
+
+        clauses = sum(expression_clauses(row.get(column)) for column in EXPRESSION_COLUMNS)
+        fan_out = len(dependents.get(name, ())) if name else 0
+        inline_choices = 0
+        if q_type.startswith(SELECT_PREFIXES):
+            inline_choices = list_sizes.get(q_type.split()[-1], 0)
+
+        if clauses > MAX_CLAUSES:
+            notes.append(f"{clauses} kushte XPath")
+        if fan_out > MAX_FAN_OUT:
+            notes.append(f"{fan_out} fusha varen nga kjo")
+        if inline_choices > MAX_INLINE_CHOICES:
+            notes.append(f"{inline_choices} opsione brenda formularit (përdor listat CSV)")
+        # A filtered inline list is re-filtered option by option
+        if inline_choices and row.get("choice_filter"):
+            clauses *= max(1, inline_choices // 100)
+
+        entry = {
+            "row": sheet_row(index),
+            "name": name,
+            "type": q_type,
+            "clauses": clauses,
+            "references": len(references[index]),
+            "fan_out": fan_out,
+            "choices": inline_choices,
+            "score": clauses + len(references[index]) + fan_out + inline_choices // 100,
+            "notes": notes
+        }
+
+        if q_type in GROUP_TYPES:
+            open_groups.append({
+                "entry": entry,
+                "field_list": "field-list" in (row.get("appearance") or ""),
+                "required": 0
+            })
+            if len(open_groups) > MAX_GROUP_DEPTH:
+                notes.append(f"grup i thellë {len(open_groups)} nivele")
+                entry["score"] += len(open_groups)
+        elif row.get("required") in ("yes", "true", "true()"):
+            for group in open_groups:
+                group["required"] += 1
+
+        entries.append(entry)
+
+    entries = [entry for entry in entries if entry["score"]]
+    entries.sort(key=lambda entry: (-entry["score"], entry["row"]))
+    return entries
+
+
+def format_cost_entry(entry):
+    notes = f" ({'; '.join(entry['notes'])})" if entry["notes"] else ""
+    return f"rreshti {entry['row']}, {entry['name']}: pesha {entry['score']}{notes}"
+
+
+def cost_report_csv(entries):
+    """UTF-8 bytes of the cost report, one line per scored row."""
+    output = StringIO()
+    writer = csv.writer(output)
+    writer.writerow(COST_REPORT_COLUMNS)
+    for entry in entries:
+        writer.writerow([
+            entry["row"], entry["name"], entry["type"], entry["clauses"], entry["references"],
+            entry["fan_out"], entry["choices"], entry["score"], "; ".join(entry["notes"])
+        ])
+    return output.getvalue().encode("utf-8")
@@ -0,0 +1,131 @@
+"""
+Extraction of Word questionnaires into the flat table used for official translations.
+"""
+import re
+
+QUESTION_PATTERN = re.compile(
+    r"\[ *(single|multiple|open|text|numeric|matrix(?: [a-z0-9]*)*|multiple matrix|scale|other) *\]",
+    re.IGNORECASE,
+)
+
+HINT_PATTERN = re.compile(r"\[ *Hint: *(.*?) *\]", re.IGNORECASE) 
+
+def clean_question_text(text):
+    return QUESTION_PATTERN.sub("", text).strip()
+
+def get_numbering(para):
+    for run in para.runs:
+        if run.text.strip():
+            return run.text.strip()
+    return ""
+
+def is_list_option(para):
+    return para.style and para.style.name.lower().startswith("list")
+
+def extract_matrix_table(table, data, parent_qid, parent_qtext):
+    rows = table.rows
+    if not rows or len(rows) < 2:
+        return
+    headers = [cell.text.strip() for cell in rows[0].cells[1:] if cell.text.strip()]
+    data.append({"Question ID": parent_qid, "Question Text": parent_qtext, "Option ID": None, "Option Text": None, "hint": ""})
+    for row_index, row in enumerate(rows[1:], start=1):
+        cells = row.cells
+        subquestion_text = cells[0].text.strip()
+        if not subquestion_text:
+            continue
+        sub_qid = f"{parent_qid}_{row_index}"
+        data.append({"Question ID": sub_qid, "Question Text": subquestion_text, "Option ID": None, "Option Text": None, "hint": ""})
+        for col_index, option_text in enumerate(headers, start=1):
+            if option_text:
+                option_qid = f"{sub_qid}.{col_index}"
+                data.append({"Question ID": sub_qid, "Question Text": "", "Option ID": option_qid, "Option Text": option_text, "hint": ""})
+
+NOTE_PATTERN = re.compile(r"^\[note\]\s*(.*)", re.IGNORECASE)
+
+def extract_from_docx_to_excel(docx_file):
+    """
+    Flatten a Word questionnaire into Question ID / Question Text / Option ID /
+    Option Text / hint rows (one DataFrame), the layout the translators fill in.
+    """
+    import pandas as pd
+    from docx import Document
+
+    doc = Document(docx_file)
+    data, question_counter, note_counter, table_index = [], 0, 0, 0
+    paragraphs, para_index = list(doc.paragraphs), 0
+    skip_options, last_matrix_qid, last_matrix_qtext = False, None, None
+
+    while para_index < len(paragraphs):
+        para = paragraphs[para_index]
+        text = para.text.strip()
+
+        if not text:
+            para_index += 1
+            continue
+
+        note_match = NOTE_PATTERN.match(text)
+        if note_match:
+            note_counter += 1
+            note_text = note_match.group(1).strip()
+            data.append({
+                "Question ID": f"NOTE{note_counter}",
+                "Question Text": note_text,
+                "Option ID": None,
+                "Option Text": None,
+                "hint": ""
+            })
+            para_index += 1
+            continue
+
+        if QUESTION_PATTERN.search(text) or re.match(r"^Q\d+\.", text):
+            question_counter += 1
+            qid = f"Q{question_counter}"
+
+            hint_match = HINT_PATTERN.search(text)
+            hint_text = hint_match.group(1).strip() if hint_match else ""
+
+            cleaned = HINT_PATTERN.sub("", clean_question_text(text)).strip()
+
+            data.append({
+                "Question ID": qid,
+                "Question Text": cleaned,
+                "Option ID": None,
+                "Option Text": None,
+                "hint": hint_text
+            })
+
+            if "matrix" in text.lower():
+                if table_index < len(doc.tables):
+                    last_matrix_qid, last_matrix_qtext = qid, cleaned
+                    extract_matrix_table(doc.tables[table_index], data, qid, cleaned)
+                    table_index += 1
+                skip_options = True
+            elif "scale" in text.lower():
+                skip_options = True
+            else:
+                skip_options = False
+
+        elif is_list_option(para) and not skip_options and question_counter:
+            prefix = get_numbering(para)
+            full_option = f"{prefix} {text}" if prefix and not text.startswith(prefix) else text
+            qid = f"Q{question_counter}"
+            option_count = len([d for d in data if d['Question ID'] == qid and d['Option ID']])
+            data.append({
+                "Question ID": qid,
+                "Question Text": None,
+                "Option ID": f"{qid}_option_{option_count+1}",
+                "Option Text": full_option,
+                "hint": ""  # Options don't have hints
+            })
+
+        para_index += 1
+
+    while table_index < len(doc.tables):
+        table = doc.tables[table_index]
+        first_col = [row.cells[0].text.strip() for row in table.rows[1:] if row.cells and row.cells[0].text.strip()]
+        if any(re.match(r"\d+(\.\d+)?", cell) for cell in first_col):
+            parent_qid = last_matrix_qid or f"Q{question_counter+1}"
+            extract_matrix_table(table, data, parent_qid, last_matrix_qtext or "Matrix Question")
+        table_index += 1
+
+    return pd.DataFrame(data)
@@ -0,0 +1,151 @@
+"""
+Gemini client helpers shared by the translation and categorization engines.
+
+google.generativeai is imported on first use, so importing the engines does not
+pull in the SDK until a model is actually requested.
+"""
+import random
+import re
+import threading
+import time
+from collections import deque
+
+GEMINI_PRICING = {
+    "models/gemini-2.5-pro": {
+        "inputPer1MTokens_low":   1.25,
+        "outputPer1MTokens_low":  10.00,
+        "inputPer1MTokens_high":  2.50,
+        "outputPer1MTokens_high": 15.00,
+        "tier_threshold": 200_000,
+    },
+    "models/gemini-2.5-flash": {
+        "inputPer1MTokens":  0.30,
+        "outputPer1MTokens": 2.50,
+    },
+    "models/gemini-3.1-flash-lite-preview": {
+        "inputPer1MTokens":  0.25,
+        "outputPer1MTokens": 1.50,
+    },
+}
+
+TRANSLATION_MODEL_NAME = "gemini-3.1-flash-lite-preview"
+
+# Project quota for the translation model (requests and tokens per minute)
+TRANSLATION_RPM = 4000
+TRANSLATION_TPM = 4_000_000
+
+RATE_LIMIT_WINDOW_SECONDS = 60
+RETRY_DELAY_PATTERN = re.compile(r"retry in ([\d.]+)\s*s", re.IGNORECASE)
+
+LANGUAGE_OPTIONS_UI = {
+    "Gjuha Shqipe": "sq",
+    "Gjuha Angleze": "en",
+    "Gjuha Serbe": "sr",
+    "Gjuha Maqedonase": "mk",
+    "Gjuha Boshnjake": "bs"
+}
+
+LANG_NAMES = {
+    "sq": "Albanian",
+    "en": "English",
+    "sr": "Serbian (Latin script)",
+    "mk": "Macedonian (Latin script)",
+    "bs": "Bosnian"
+}
+
+
+def calculate_gemini_cost(prompt_tokens: int, completion_tokens: int, model: str, default_model: str = "models/gemini-2.5-flash") -> float:
+    pricing = GEMINI_PRICING.get(model, GEMINI_PRICING[default_model])
+    if "tier_threshold" in pricing:
+        high = (prompt_tokens or 0) > pricing["tier_threshold"]
+        input_rate  = pricing["inputPer1MTokens_high"]  if high else pricing["inputPer1MTokens_low"]
+        output_rate = pricing["outputPer1MTokens_high"] if high else pricing["outputPer1MTokens_low"]
+    else:
+        input_rate  = pricing["inputPer1MTokens"]
+        output_rate = pricing["outputPer1MTokens"]
+    input_cost  = ((prompt_tokens     or 0) / 1_000_000) * input_rate
+    output_cost = ((completion_tokens or 0) / 1_000_000) * output_rate
+    return round(input_cost + output_cost, 8)
+
+
+def configure(api_key):
+    import google.generativeai as genai
+
+    genai.configure(api_key=api_key)
+
+
+def generative_model(model_name):
+    import google.generativeai as genai
+
+    return genai.GenerativeModel(model_name)
+
+
+def generation_config(**kwargs):
+    import google.generativeai as genai
+
+    return genai.types.GenerationConfig(**kwargs)
+
+
+def is_rate_limit_error(error):
+    """True for a 429 / quota-exhausted error from the Gemini API."""
+    if getattr(error, "code", None) == 429 or type(error).__name__ == "ResourceExhausted":
+        return True
+    message = str(error).lower()
+    return "429" in message or "quota" in message or "rate limit" in message
+
+
+def retry_delay_seconds(error, attempt):
+    """The delay the API asked for ("retry in 12.5s"), else jittered exponential backoff."""
+    m = RETRY_DELAY_PATTERN.search(str(error))
+    if m:
+        return float(m.group(1)) + random.uniform(0, 1)
+    return min(2 ** attempt, RATE_LIMIT_WINDOW_SECONDS) + random.uniform(0, 1)
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute budget shared by worker threads,
+    over a sliding one-minute window. Either limit may be None.
+    """
+
+    def __init__(self, rpm=None, tpm=None):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.lock = threading.Lock()
+        self.window = deque()  # (sent_at, tokens)
+        self.window_tokens = 0
+
+    def acquire(self, tokens=0):
+        """Block until one more request of about `tokens` tokens fits both limits."""
+        if self.tpm:
+            # A batch bigger than the whole budget still goes, alone
+            tokens = min(tokens, self.tpm)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                while self.window and now - self.window[0][0] >= RATE_LIMIT_WINDOW_SECONDS:
+                    self.window_tokens -= self.window.popleft()[1]
+                fits_requests = not self.rpm or len(self.window) < self.rpm
+                fits_tokens = not self.tpm or self.window_tokens + tokens <= self.tpm
+                if fits_requests and fits_tokens:
+                    self.window.append((now, tokens))
+                    self.window_tokens += tokens
+                    return
+                wait = RATE_LIMIT_WINDOW_SECONDS - (now - self.window[0][0])
+            time.sleep(max(wait, 0.01))
+
+
+def is_truncated(response):
+    """True when generation stopped at max_output_tokens, leaving the reply incomplete."""
+    candidates = getattr(response, "candidates", None) or []
+    if not candidates:
+        return False
+    reason = getattr(candidates[0], "finish_reason", None)
+    return getattr(reason, "name", reason) in ("MAX_TOKENS", 2)
+
+
+def usage_tokens(response):
+    """(prompt_tokens, output_tokens) of a generate_content response."""
+    in_tok = getattr(response.usage_metadata, "prompt_token_count", 0) or 0
+    out_tok = getattr(response.usage_metadata, "candidates_token_count", 0) or 0
+    return in_tok, out_tok
@@ -0,0 +1,127 @@
+"""
+Project glossary enforced in the translation prompts.
+
+Only the entries that occur in a batch are sent with it, so the terminology stays
+consistent without paying for the whole glossary on every call. The terms of a
+source language are compiled into one Aho-Corasick automaton, which finds every
+term in a text in a single pass however many terms there are.
+"""
+from collections import deque
+from functools import lru_cache
+
+from kobo_automation.question_bank import TRANSLATION_PAIRS
+
+GLOSSARY_LANGS = ("sq", "sr", "en")
+
+# Names that must come out the same in every questionnaire, as (sq, sr, en)
+PROJECT_TERMS = [
+    ("UBO Consulting", "UBO Consulting", "UBO Consulting"),
+    ("KoboToolbox", "KoboToolbox", "KoboToolbox"),
+    ("Republika e Kosovës", "Republika Kosovo", "Republic of Kosovo"),
+    ("Kuvendi i Kosovës", "Skupština Kosova", "Assembly of Kosovo"),
+    ("Qeveria e Kosovës", "Vlada Kosova", "Government of Kosovo"),
+    ("Policia e Kosovës", "Kosovska policija", "Kosovo Police"),
+    ("Agjencia e Statistikave të Kosovës", "Agencija za statistiku Kosova", "Kosovo Agency of Statistics"),
+    ("Komisioni Qendror i Zgjedhjeve", "Centralna izborna komisija", "Central Election Commission"),
+    ("Bashkimi Evropian", "Evropska unija", "European Union"),
+    ("Kombet e Bashkuara", "Ujedinjene nacije", "United Nations"),
+    ("Kuvendi Komunal", "Skupština opštine", "Municipal Assembly"),
+]
+
+# Shorter terms (Po/Jo, Da/Ne) occur inside ordinary sentences and are left to the model
+MIN_TERM_LENGTH = 4
+
+
+def is_word_boundary(text, position):
+    return position < 0 or position >= len(text) or not text[position].isalnum()
+
+
+class TermIndex:
+    """Aho-Corasick automaton over lower-cased terms, matching whole words only."""
+
+    def __init__(self, terms):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]  # (term_index, length) of the terms ending at each node
+        for index, term in enumerate(terms):
+            term = term.lower()
+            node = 0
+            for char in term:
+                if char not in self.goto[node]:
+                    self.goto[node][char] = len(self.goto)
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                node = self.goto[node][char]
+            self.output[node].append((index, len(term)))
+
+        # Breadth-first, so every fail link points at an already finished node
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def find(self, text):
+        """Indices of the terms occurring in `text` as whole words, case-insensitively."""
+        text = text.lower()
+        found = set()
+        node = 0
+        for position, char in enumerate(text):
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+            for index, length in self.output[node]:
+                if is_word_boundary(text, position - length) and is_word_boundary(text, position + 1):
+                    found.add(index)
+        return found
+
+
+class Glossary:
+    """
+    Terms given as {lang: term} entries, indexed once per source language in
+    GLOSSARY_LANGS. Read-only after construction, so translation workers share it.
+    """
+
+    def __init__(self, entries):
+        self.entries = {}
+        self.indexes = {}
+        for lang in GLOSSARY_LANGS:
+            # The first entry of a term wins, as in the official translation page's dictionaries
+            by_term = {}
+            for entry in entries:
+                term = " ".join(entry.get(lang, "").split())
+                if len(term) >= MIN_TERM_LENGTH:
+                    by_term.setdefault(term.lower(), (term, entry))
+            self.entries[lang] = list(by_term.values())
+            self.indexes[lang] = TermIndex([term for term, _ in self.entries[lang]])
+
+    def terms_for(self, texts, from_lang, to_langs):
+        """
+        (source_term, {lang: target_term}) for every entry occurring in `texts`,
+        in glossary order, with the targets limited to `to_langs`.
+        """
+        if from_lang not in self.indexes:
+            return []
+        found = set()
+        for text in texts:
+            found |= self.indexes[from_lang].find(text)
+
+        terms = []
+        for index in sorted(found):
+            term, entry = self.entries[from_lang][index]
+            targets = {lang: entry[lang] for lang in to_langs if entry.get(lang)}
+            if targets:
+                terms.append((term, targets))
+        return terms
+
+
+@lru_cache(maxsize=None)
+def project_glossary():
+    """PROJECT_TERMS plus the official (sq, sr, en) wording of the question bank."""
+    return Glossary([dict(zip(GLOSSARY_LANGS, triple)) for triple in PROJECT_TERMS + TRANSLATION_PAIRS])
@@ -0,0 +1,184 @@
+"""
+Formatting checks for a tagged Word questionnaire before it is generated.
+
+build_xlsform stops at the first line it cannot emit; lint_questionnaire walks the
+whole token stream once and reports every problem it can find, so a document can
+be fixed in one round instead of one upload per mistake.
+
+Brackets on answer and free-text lines are often interviewer remarks ([MOS E LEXO])
+that the generator ignores, so lint_warnings reports the odd ones there without
+blocking the document.
+"""
+import re
+
+from kobo_automation.question_bank import compile_fragment
+from kobo_automation.xlsform import (
+    CASCADE_TAG_PATTERN, FRAGMENT_PATTERN, GENERIC_TYPES, MATRIX_TAG_PATTERN, RANKING_TAG_PATTERN,
+    REPEAT_BEGIN_PATTERN, REPEAT_END_PATTERN, SCALE_TAG_PATTERN,
+    extract_tags, parse_question_tags, tokenize_lines
+)
+
+# Tag → (pattern it must match in full, expected form shown in the message)
+TAG_FORMS = {
+    "matrix": (MATRIX_TAG_PATTERN, "[matrix single N] ose [matrix multiple N]"),
+    "ranking": (RANKING_TAG_PATTERN, "[ranking N]"),
+    "scale": (SCALE_TAG_PATTERN, "[scale 1(Etiketa)-5(Etiketa)]"),
+    "cascade": (CASCADE_TAG_PATTERN, "[cascade NUMRI_I_PYETJES]"),
+}
+TYPE_TAG_PREFIXES = ("matrix", "ranking", "scale")
+# Answer lines may start with a bracketed label that clean_label_prefix strips
+LABEL_PREFIX_PATTERN = re.compile(r"^\s*\[[a-zA-Z0-9]+\]\s*")
+
+
+def tag_problems(line):
+    """Messages for the bracketed tags of one line."""
+    problems = []
+    if line.count("[") != line.count("]"):
+        problems.append("kllapat [ ] nuk janë të balancuara")
+
+    type_tags = []
+    for raw_tag in extract_tags(line):
+        tag = raw_tag.strip().lower()
+        keyword = tag.split(" ", 1)[0]
+        if tag in ("random", "note") or tag.startswith("hint:"):
+            continue
+        if tag in GENERIC_TYPES:
+            type_tags.append(tag)
+        elif keyword in TAG_FORMS:
+            pattern, form = TAG_FORMS[keyword]
+            if not pattern.fullmatch(tag):
+                problems.append(f"tag-u [{raw_tag}] nuk është i formatuar mirë; forma e saktë: {form}")
+            elif keyword in TYPE_TAG_PREFIXES:
+                type_tags.append(keyword)
+        elif keyword == "hint":
+            problems.append(f"tag-u [{raw_tag}] duhet të jetë [hint: teksti]")
+        elif keyword in ("repeat", "end", "fragment") and line.lstrip().startswith("["):
+            # Line-level tags are checked against their own patterns below
+            if not (REPEAT_BEGIN_PATTERN.match(line) or REPEAT_END_PATTERN.match(line) or FRAGMENT_PATTERN.match(line)):
+                problems.append(f"tag-u [{raw_tag}] nuk është i formatuar mirë")
+        else:
+            problems.append(f"tipi i panjohur [{raw_tag}]")
+
+    if len(type_tags) > 1:
+        problems.append(f"rreshti ka më shumë se një tip: {', '.join(type_tags)}")
+    return problems
+
+
+def lint_questionnaire(lines, tokens=None):
+    """
+    Check the non-empty lines of a questionnaire (as read_docx_lines returns them).
+    Returns a list of (line_number, line, message) tuples ordered by line, 1-based
+    over those lines; an empty list means the generator will accept the document.
+    """
+    if tokens is None:
+        tokens = tokenize_lines(lines)
+
+    problems = []
+    # Every line yields exactly one token, so token index + 1 is the line number
+    for index, line in enumerate(lines):
+        if tokens[index]["kind"] == "question":
+            problems.extend((index + 1, line, message) for message in tag_problems(line))
+
+    select_numbers = set()
+    question_numbers = set()
+    open_repeats = []
+    index = 0
+    while index < len(tokens):
+        token = tokens[index]
+        line_number = index + 1
+        kind = token["kind"]
+        index += 1
+
+        if kind == "fragment":
+            try:
+                fragment = compile_fragment(token["name"], token["version"])
+            except ValueError as e:
+                problems.append((line_number, token["line"], str(e)))
+            else:
+                question_numbers.update(row["name"].lower() for row in fragment["survey"])
+            continue
+
+        if kind == "repeat_begin":
+            count = token["count"]
+            if not count.isdigit() and count.lower() not in question_numbers:
+                problems.append((line_number, token["line"], f"pyetja '{count}' e [repeat] nuk gjendet para këtij rreshti"))
+            open_repeats.append(line_number)
+            continue
+
+        if kind == "repeat_end":
+            if open_repeats:
+                open_repeats.pop()
+            else:
+                problems.append((line_number, token["line"], "[end repeat] pa [repeat]"))
+            continue
+
+        if kind != "question":
+            continue
+
+        q_type = token["q_type"]
+        qnum = (token["qnum"] or "").rstrip('.').lower()
+        if qnum:
+            question_numbers.add(qnum)
+
+        body = 0
+        while index + body < len(tokens) and tokens[index + body]["kind"] == "option":
+            body += 1
+
+        if q_type in ("single", "multiple"):
+            if not body:
+                problems.append((line_number, token["line"], f"pyetja [{q_type}] nuk ka asnjë opsion"))
+            cascade = token.get("cascade")
+            if cascade and cascade.lower() not in select_numbers:
+                problems.append((line_number, token["line"], f"[cascade {cascade}] duhet t'i referohet një pyetjeje single/multiple para saj"))
+            if qnum:
+                select_numbers.add(qnum)
+
+        elif q_type.startswith("ranking"):
+            if not body:
+                problems.append((line_number, token["line"], "renditja nuk ka asnjë opsion"))
+            elif body < token["matrix_count"]:
+                problems.append((line_number, token["line"], f"renditja kërkon {token['matrix_count']} zgjedhje, por ka vetëm {body} opsione"))
+
+        elif q_type.startswith("matrix"):
+            expected = token["matrix_count"]
+            columns = tokens[index:index + expected]
+            # A tagged line taken as a column means the document has fewer columns than declared
+            for offset, column in enumerate(columns):
+                if parse_question_tags(extract_tags(column["line"]))[0]:
+                    problems.append((line_number, token["line"], f"matrix pret {expected} kolona, por rreshti {index + offset + 1} është pyetje; mungojnë kolona"))
+                    break
+            else:
+                if len(columns) < expected:
+                    problems.append((line_number, token["line"], f"matrix pret {expected} kolona, por dokumenti mbaron pas {len(columns)}"))
+                elif index + expected >= len(tokens) or tokens[index + expected]["kind"] != "matrix_row":
+                    problems.append((line_number, token["line"], "matrix nuk ka asnjë rresht"))
+
+    for line_number in open_repeats:
+        problems.append((line_number, lines[line_number - 1], "[repeat] pa [end repeat]"))
+
+    problems.sort(key=lambda problem: problem[0])
+    return problems
+
+
+def lint_warnings(lines, tokens=None):
+    """
+    Tag problems on the lines that are not questions, as lint_questionnaire's tuples.
+    A misspelled type tag lands here too, since it leaves its line untyped; none of
+    them stops the generator.
+    """
+    if tokens is None:
+        tokens = tokenize_lines(lines)
+
+    warnings = []
+    for index, line in enumerate(lines):
+        kind = tokens[index]["kind"]
+        if kind in ("question", "matrix_column"):
+            continue
+        checked = LABEL_PREFIX_PATTERN.sub("", line) if kind in ("option", "matrix_row") else line
+        warnings.extend((index + 1, line, message) for message in tag_problems(checked))
+    return warnings
+
+
+def format_lint_problem(problem):
+    line_number, line, message = problem
+    return f"rreshti {line_number} ('{line[:60]}'): {message}"
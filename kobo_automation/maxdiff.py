@@ -0,0 +1,122 @@
+"""
+MaxDiff (best-worst scaling) models over a CSV with Attribute 1–5, Best and Worst
+columns (plus Response ID for the hierarchical model).
+
+pymc and arviz are only imported when the HB model is fitted.
+"""
+from collections import defaultdict
+
+ATTRIBUTE_COLS = [f"Attribute {i}" for i in range(1, 6)]
+
+
+def simple_count_analysis(df):
+    """
+    Best-minus-worst score per attribute, normalized by how often it was shown.
+    Returns (results_df sorted by score, warnings).
+    """
+    import pandas as pd
+
+    best_counts = defaultdict(int)
+    worst_counts = defaultdict(int)
+    appearance_counts = defaultdict(int)
+    warnings = []
+
+    for _, row in df.iterrows():
+        attributes_shown = [row[col] for col in ATTRIBUTE_COLS]
+        best = row["Best"]
+        worst = row["Worst"]
+
+        for attr in attributes_shown:
+            appearance_counts[attr] += 1
+
+        if best in attributes_shown:
+            best_counts[best] += 1
+        else:
+            warnings.append(f"Warning: Best item '{best}' not found in {attributes_shown}")
+
+        if worst in attributes_shown:
+            worst_counts[worst] += 1
+        else:
+            warnings.append(f"Warning: Worst item '{worst}' not found in {attributes_shown}")
+
+    all_attrs = sorted(set(appearance_counts.keys()))
+    results = []
+
+    for attr in all_attrs:
+        best = best_counts.get(attr, 0)
+        worst = worst_counts.get(attr, 0)
+        appeared = appearance_counts[attr]
+        score = (best - worst) / appeared if appeared > 0 else 0
+        results.append({
+            "Attribute": attr,
+            "Best Count": best,
+            "Worst Count": worst,
+            "Times Shown": appeared,
+            "Score (Simple Count Analysis)": round(score, 3)
+        })
+
+    results_df = pd.DataFrame(results).sort_values(by="Score (Simple Count Analysis)", ascending=False)
+    return results_df, warnings
+
+
+def hierarchical_bayes_analysis(df, draws=1000, tune=2000, chains=4):
+    """
+    Fit a hierarchical Bayesian best-worst model with per-respondent utilities.
+    Returns the posterior summary of the attribute means with a 0–100 relative
+    importance, sorted descending, or None when no row has both Best and Worst
+    among the attributes shown.
+    """
+    import numpy as np
+
+    attributes = sorted(set(df[ATTRIBUTE_COLS].values.flatten()))
+    attr_index = {attr: i for i, attr in enumerate(attributes)}
+    n_attrs = len(attributes)
+
+    pairwise_data = []
+    respondent_ids = []
+
+    for _, row in df.iterrows():
+        respondent = row["Response ID"]
+        attrs = [row[col] for col in ATTRIBUTE_COLS]
+        best = row["Best"]
+        worst = row["Worst"]
+
+        if best in attrs and worst in attrs:
+            pairwise_data.append((attr_index[best], attr_index[worst]))
+            respondent_ids.append(respondent)
+
+    if not pairwise_data:
+        return None
+
+    import pymc as pm
+    import arviz as az
+
+    respondents = sorted(set(respondent_ids))
+    respondent_map = {resp: i for i, resp in enumerate(respondents)}
+
+    best_ids = np.array([b for b, w in pairwise_data])
+    worst_ids = np.array([w for b, w in pairwise_data])
+    resp_ids = np.array([respondent_map[r] for r in respondent_ids])
+    n_resp = len(respondents)
+
+    with pm.Model() as model:
+        mu = pm.Normal("mu", mu=0, sigma=1, shape=n_attrs)
+        sigma = pm.HalfNormal("sigma", sigma=1)
+        utilities = pm.Normal("utilities", mu=mu, sigma=sigma, shape=(n_resp, n_attrs))
+        u_diff = utilities[resp_ids, best_ids] - utilities[resp_ids, worst_ids]
+        observed_data = np.ones(len(best_ids), dtype=np.int8)
+        pm.Bernoulli("obs", logit_p=u_diff, observed=observed_data)
+        trace = pm.sample(draws, tune=tune, target_accept=0.95, chains=chains, return_inferencedata=True)
+
+    summary_df = az.summary(trace, var_names=["mu"])
+    summary_df.index = [f"mu[{i}]" for i in range(len(summary_df))]
+    summary_df["Attribute"] = [attributes[i] for i in range(len(attributes))]
+    summary_df = summary_df.reset_index(drop=True)
+
+    # Calculate Relative Importance (0–100)
+    min_util = summary_df["mean"].min()
+    max_util = summary_df["mean"].max()
+    summary_df["Relative Importance (0–100)"] = ((summary_df["mean"] - min_util) / (max_util - min_util) * 100).round(1)
+
+    # Sort by importance descending
+    return summary_df.sort_values(by="Relative Importance (0–100)", ascending=False)
@@ -0,0 +1,269 @@
+"""
+Standard question blocks shared by the questionnaires, with their Albanian,
+Serbian and English wording.
+
+The (sq, sr, en) triples feed the manual dictionary of the official translation
+page. The same wording is compiled into versioned XLSForm fragments (survey rows,
+choices and every language column) that a `[fragment NAME]` or
+`[fragment NAME VERSION]` line splices into a generated form.
+"""
+from functools import lru_cache
+
+CORE_PAIRS = [
+    ("GPS", "GPS", "GPS"),
+    ("Anketuesi_ja", "Anketar/e", "Enumerator"),
+    ("A pranoni të merrni pjesë në anketë?", "Da li se slažete da učestvujete u anketi?", "Do you agree to participate in the survey?"),
+    ("Arsyet e refuzimit", "Razlozi za odbijanje", "Reasons for refusal"),
+    ("Tjetër, specifiko", "Drugo, navedite", "Other, specify"),
+    ("Po", "Da", "Yes"),
+    ("Jo", "Ne", "No"),
+    ("Tjetër. Çka?", "Drugo. Šta?", "Other. What?"),
+    ("Tjetër, ju lutem specifikoni", "Drugo, navedite", "Other, please specify")
+]
+
+LIKERT_PAIRS = [
+    ("1-Aspak i kënaqur", "1-Uopšte nisam zadovoljan/na", "1-Not at all satisfied"),
+    ("5-Plotësisht i kënaqur", "5-Potpuno zadovoljan/zadovoljna", "5-Completely satisfied"),
+
+    ("1-Aspak nuk pajtohem", "1-Uopšte se ne slažem", "1-Strongly disagree"),
+    ("5-Plotësisht pajtohem", "5-Potpuno se slažem", "5-Strongly agree"),
+
+    ("1– Aspak efektive", "1 – Uopšte efektivno", "1-Not effective at all"),
+    ("5– Plotësisht efektive", "5 – Potpuno efektivno", "5-Completely effective"),
+
+    ("1-Aspak e sigurtë", "1-Uopšte nije bezbedno", "1-Not safe at all"),
+    ("5-Plotësisht e sigurtë", "5-Potpuno je bezbedno", "5-Completely safe"),
+
+    ("1-Aspak meritore", "1-Nimalo zaslužne", "1-Not deserving at all"),
+    ("5-Plotësisht meritore", "5-Potpuno zaslužne", "5-Completely deserving"),
+
+    ("Shumë negative", "Veoma negativno", "Very negative"),
+    ("Shumë pozitive", "Veoma pozitivno", "Very positive"),
+
+    ("1 – aspak i mirë", "1 – uopšte nije dobar", "1-Not good at all"),
+    ("5 – shumë i mirë", "5 – veoma dobar", "5-Very good"),
+
+    ("88 – Refuzoj të përgjigjem", "Odbijam odgovoriti", "88-Refuse to answer"),
+    ("Refuzoj të përgjigjem", "Odbijam odgovoriti", "Refuse to answer")
+]
+
+DEMOGRAPHIC_PAIRS = [
+    ("D1. (GJINIA)", "D1. (ROD/POL)", "D1. (GENDER)"),
+    ("D2. (MOSHA) (vjet)", "D2. (STAROST) (godine)", "D2. (AGE) (years)"),
+    ("D3. (STATUSI MARTESOR)  Aktualisht Ju jeni...", "D3. (BRAČNO STANJE) Trenutno vi ste…", "D3. (MARITAL STATUS) Currently you are..."),
+    ("D4.  (EDUKIMI)  Sa vite shkollë i keni kryer?", "D4. (OBRAZOVANJE) Koliko godina škole ste završili?", "D4. (EDUCATION) How many years of schooling have you completed?"),
+    ("D5.  (PËRKATËSIA ETNIKE)  Cili është nacionaliteti Juaj/cilit grup i takoni?", "D5. (ETNIČKA PRIPADNOST) Koja je vaša etnička pripadnost/kojoj grupi pripadate?", "D5. (ETHNICITY) What is your nationality/which group do you belong to?"),
+    ("Tjetër. Cili?", "Drugo. Koja?", "Other. Which?"),
+    ("D6. (FAMILJA)  Sa anëtarë i ka familja Juaj?", "D6. (PORODICA) Koliko članova ima vaša porodica?", "D6. (FAMILY) How many members are in your family?"),
+    ("D7. (PUNËSIMI) Cili është statusi Juaj i punësimit?", "D7. (ZAPOSLENJE) Koji je vaš radni status?", "D7. (EMPLOYMENT) What is your employment status?"),
+    ("D8. (TË ARDHURAT PERSONALE) A mund të na tregoni se sa kanë qenë të ardhurat personale në muajin e fundit?",
+    "D8. (LIČNI PRIHODI) Da li nam možete reći koliki su bili vaši lični prihodi u zadnjem mesecu?",
+    "D8. (PERSONAL INCOME) Can you tell us what your personal income was last month?"),
+    ("D9.  (TË ARDHURAT FAMILJARE) A mund të na tregoni se sa kanë qenë të ardhurat familjare në muajin e fundit?",
+    "D9. (PORODIČNI PRIHODI) Da li nam možete reći koliki je bio vaš porodični prihod u zadnjem mesecu?",
+    "D9. (HOUSEHOLD INCOME) Can you tell us what your household income was last month?"),
+    ("D10. Komuna", "Opstina", "D10. Municipality"),
+    ("D11.    VENDBANIMI", "D11. PREBIVALIŠTE", "D11. Residence"),
+    ("Emri i lagjes", "Naziv komšiluka", "Neighborhood name"),
+    ("Emri i fshatit", "Ime sela", "Village name"),
+    ("Emri dhe mbiemri", "Ime i prezime", "Full name"),
+    ("Numri i telefonit", "Broj telefona", "Phone number")
+]
+
+EXTRA_PAIRS = [("Mashkull", "Muško", "Male"), ("Femër", "Žensko", "Female")]
+
+REASON_PAIRS = [
+    ("Mungesa e kohës", "Nedostatak vremena", "Lack of time"),
+    ("Jo i interesuar", "Nije zainteresovan", "Not interested"),
+    ("Mbrojtja e të dhënave, përdorimi i të drejtës së privatësisë",
+    "Zaštita podataka, korišćenje politike privatnosti",
+    "Data protection, use of privacy rights"),
+    ("Nuk beson në sondazhe", "Ne veruje u ankete", "Does not believe in surveys"),
+    ("Të tjera (nuk di të përgjigjet, kushtet e motit, frikë nga pyetjet)",
+    "Ostalo (ne zna da odgovori, vremenski uslovi, strah od pitanja)",
+    "Other (don’t know how to answer, weather conditions, fear of questions)"),
+    ("Problemet e shëndetit", "Zdravstveni problemi", "Health problems"),
+    ("Moshë më e vjetër", "Starije godine", "Older age"),
+    ("Nuk i pëlqen subjekti i kërkimit", "Ne voli temu istraživanja", "Does not like research topic"),
+    ("Ka pasur një përvojë të keqe me sondazhet",
+    "Imao/la je loše iskustvo sa anketama",
+    "Had a bad experience with surveys"),
+    ("Asnjë arsye", "Nema razloga", "No reason")
+]
+
+DEMOGRAPHIC_ANSWER_PAIRS = [
+    ("Mashkull", "Muško", "Male"),
+    ("Femër", "Žensko", "Female"),
+    ("I/ e martuar", "Oženjen/Udata", "Married"),
+    ("I/ e pamartuar", "Neoženjen/Neudata", "Single"),
+    ("I/ e ndarë", "Razveden/a", "Divorced"),
+    ("I/e vej", "Udovac/udovica", "Widowed"),
+    ("Disa vite të shkollës fillore", "Nekoliko godina osnovne škole", "Some years of primary school"),
+    ("Shkolla fillore", "Osnovna škola", "Primary school"),
+    ("Disa vite të shkollës së mesme", "Nekoliko godina srednje škole", "Some years of secondary school"),
+    ("Shkolla e mesme", "Srednja škola", "Secondary school"),
+    ("Student", "Student", "Student"),
+    ("Fakultet", "Fakultet", "University"),
+    ("Magjistraturë ose Doktoraturë", "Magistratura ili", "Masters or Doctorate"),
+    ("Shqiptar", "Albanska", "Albanian"),
+    ("Serb", "Srpska", "Serbian"),
+    ("Boshnjak", "Bosanska", "Bosniak"),
+    ("Goran", "Goranska", "Gorani"),
+    ("Turk", "Turska", "Turkish"),
+    ("Rom", "Romska", "Roma"),
+    ("Ashkali", "Aškalijska", "Ashkali"),
+    ("Egjiptas", "Egipatska", "Egyptian"),
+    ("Tjetër. Cili?", "Drugo. Koja?", "Other. Which?"),
+    ("DK/PP", "Ne znam/Bez odgovora", "Don't know/No answer"),
+    ("Urban", "Urbano", "Urban"),
+    ("Rural", "Ruralno", "Rural"),
+]
+
+INCOME_PAIRS = [
+    ("Deri 150 euro", "Do 150 evra", "Up to 150 euros"),
+    ("151-300 euro", "151-300 evra", "151-300 euros"),
+    ("301-450 euro", "301-450 evra", "301-450 euros"),
+    ("451-600 euro", "451-600 evra", "451-600 euros"),
+    ("601-750 euro", "601-750 evra", "601-750 euros"),
+    ("751-900 euro", "751-900 evra", "751-900 euros"),
+    ("Mbi 900 euro", "Preko 900 evra", "Over 900 euros"),
+    ("Nuk kam realizuar fare të ardhura", "Nisam ostvario/la nikakav prihod.", "I had no income"),
+    ("Refuzon/PP", "Odbija/BO", "Refused/No answer")
+]
+
+FREQUENCY_PAIRS = [
+    ("Asnjëherë", "Nikad", "Never"),
+    ("Rallë", "Retko", "Rarely"),
+    ("Ndonjëherë", "Ponekad", "Sometimes"),
+    ("Shpesh", "Često", "Often"),
+    ("Gjithmonë", "Uvek", "Always")
+]
+
+AWARENESS_PAIRS = [
+    ("Shumë i informuar", "Veoma informisani", "Very informed"),
+    ("Deri diku i informuar", "Donekle informisani", "Somewhat informed"),
+    ("Deri diku jo i informuar", "Donekle ne informisani", "Somewhat uninformed"),
+    ("Aspak i informuar", "Potpuno ne informisani", "Not at all informed")
+]
+
+SATISFACTION_PAIRS = [
+    ("Shumë të kënaqur", "Veoma zadovoljni", "Very satisfied"),
+    ("Deri diku i kënaqur", "Donekle zadovoljni", "Somewhat satisfied"),
+    ("Deri diku jo i kënaqur", "Donekle nezadovoljni", "Somewhat dissatisfied"),
+    ("Aspak i kënaqur", "Potpuno nezadovoljni", "Not at all satisfied"),
+    ("Shumë i/e kënaqur", "Veoma zadovoljni", "Very satisfied"),
+    ("I/e kënaqur", "Zadovoljni", "Satisfied"),
+    ("I/e pakënaqur", "Nezadovoljni", "Dissatisfied"),
+    ("Shumë i/e pakënaqur", "Veoma nezadovoljni", "Very dissatisfied"),
+    ("Nuk e di/refuzoj të përgjigjem (mos e lexo)",
+    "Ne znam/Odbijam odgovoriti (nemojte čitati)",
+    "Don't know/Refuse to answer (do not read)")
+]
+EMPLOYMENT_PAIRS = [
+    ("I papunësuar – duke kërkuar punë", "Nezaposlen/a – tražim posao", "Unemployed – seeking work"),
+    ("I papunësuar – duke mos kërkuar punë", "Nezaposlen/a – ne tražim posao", "Unemployed – not seeking work"),
+    ("I punësuar në sektorin publik", "Zaposlen/a u javnom sektoru", "Employed in public sector"),
+    ("I punësuar në sektorin privat", "Zaposlen/a u privatnom sektoru", "Employed in private sector"),
+    ("I punësuar kohë pas kohe", "Zaposlen/a s vremena na vreme", "Employed occasionally"),
+    ("Pensionist", "Penzioner", "Pensioner"),
+    ("Amvise", "Domaćica", "Housewife"),
+    ("Student/ nxënës", "Student/učenik", "Student/Pupil"),
+    ("Tjetër. Çka?", "Drugo. Šta?", "Other. What?")
+]
+
+VOTING_PAIRS = [
+    ("Gjithsesi do të votoja", "Svakako bih glasao/ala", "Definitely would vote"),
+    ("Ndoshta do të votoja", "Možda bih glasao/ala", "Might vote"),
+    ("Me gjasë nuk do të votoja", "Verovatno ne bih glasao/ala", "Probably would not vote"),
+    ("Definitivisht nuk do të votoja", "Definitivno ne bih glasao/ala", "Definitely would not vote")
+]
+
+TRANSLATION_PAIRS = (
+    CORE_PAIRS + VOTING_PAIRS + EMPLOYMENT_PAIRS + SATISFACTION_PAIRS + AWARENESS_PAIRS
+    + FREQUENCY_PAIRS + LIKERT_PAIRS + DEMOGRAPHIC_PAIRS + EXTRA_PAIRS + REASON_PAIRS
+    + INCOME_PAIRS + DEMOGRAPHIC_ANSWER_PAIRS
+)
+
+# Column of each wording in the compiled rows; Albanian is the form's default label
+FRAGMENT_LABEL_COLUMNS = ("label", "label::Serbian (sr)", "label::English (en)")
+
+# name → version → questions. A question is (name, type, Albanian label, Albanian
+# options or None, relevant or None); every text must have a triple above.
+FRAGMENTS = {
+    "demografia": {
+        1: [
+            ("D1", "select_one", "D1. (GJINIA)", ["Mashkull", "Femër"], None),
+            ("D2", "integer", "D2. (MOSHA) (vjet)", None, None),
+            ("D3", "select_one", "D3. (STATUSI MARTESOR)  Aktualisht Ju jeni...",
+             ["I/ e martuar", "I/ e pamartuar", "I/ e ndarë", "I/e vej"], None),
+            ("D4", "select_one", "D4.  (EDUKIMI)  Sa vite shkollë i keni kryer?",
+             ["Disa vite të shkollës fillore", "Shkolla fillore", "Disa vite të shkollës së mesme",
+              "Shkolla e mesme", "Student", "Fakultet", "Magjistraturë ose Doktoraturë"], None),
+            ("D5", "select_one", "D5.  (PËRKATËSIA ETNIKE)  Cili është nacionaliteti Juaj/cilit grup i takoni?",
+             ["Shqiptar", "Serb", "Boshnjak", "Goran", "Turk", "Rom", "Ashkali", "Egjiptas", "Tjetër. Cili?"], None),
+            ("D5_9", "text", "Tjetër. Cili?", None, "${D5} = '9'"),
+            ("D6", "integer", "D6. (FAMILJA)  Sa anëtarë i ka familja Juaj?", None, None),
+            ("D7", "select_one", "D7. (PUNËSIMI) Cili është statusi Juaj i punësimit?",
+             [al for al, _, _ in EMPLOYMENT_PAIRS], None),
+            ("D7_9", "text", "Tjetër. Çka?", None, "${D7} = '9'"),
+            ("D8", "select_one", "D8. (TË ARDHURAT PERSONALE) A mund të na tregoni se sa kanë qenë të ardhurat personale në muajin e fundit?",
+             [al for al, _, _ in INCOME_PAIRS], None),
+            ("D9", "select_one", "D9.  (TË ARDHURAT FAMILJARE) A mund të na tregoni se sa kanë qenë të ardhurat familjare në muajin e fundit?",
+             [al for al, _, _ in INCOME_PAIRS], None),
+            ("D10", "text", "D10. Komuna", None, None),
+            ("D11", "select_one", "D11.    VENDBANIMI", ["Urban", "Rural"], None),
+            ("D11_1", "text", "Emri i lagjes", None, "${D11} = '1'"),
+            ("D11_2", "text", "Emri i fshatit", None, "${D11} = '2'"),
+        ],
+    },
+    "pelqimi": {
+        1: [
+            ("pelqimi", "select_one", "A pranoni të merrni pjesë në anketë?", ["Po", "Jo"], None),
+            ("arsyet_refuzimit", "select_one", "Arsyet e refuzimit",
+             [al for al, _, _ in REASON_PAIRS], "${pelqimi} = '2'"),
+        ],
+    },
+}
+
+
+def wording(albanian):
+    """The (sq, sr, en) triple of an Albanian text, whitespace normalized."""
+    for triple in TRANSLATION_PAIRS:
+        if triple[0] == albanian:
+            return tuple(" ".join(text.split()) for text in triple)
+    raise KeyError(albanian)
+
+
+@lru_cache(maxsize=None)
+def compile_fragment(name, version=None):
+    """
+    Survey rows and choice lists of a fragment, compiled once per process.
+    `version` defaults to the latest one. Returns {"name", "version", "survey",
+    "lists"} where lists maps list_name → (name, label, extra_columns) options as
+    taken by register_choice_list. Raises ValueError for an unknown name or version.
+    """
+    versions = FRAGMENTS.get(name.lower())
+    if versions is None:
+        raise ValueError(f"Fragmenti '{name}' nuk ekziston në bankën e pyetjeve ({', '.join(FRAGMENTS)})")
+    if version is None:
+        version = max(versions)
+    if version not in versions:
+        raise ValueError(f"Fragmenti '{name}' nuk ka versionin {version} (versionet: {', '.join(map(str, versions))})")
+
+    survey = []
+    lists = {}
+    for qname, q_type, label, options, relevant in versions[version]:
+        row = {"type": q_type, "name": qname, "required": "yes"}
+        row.update(zip(FRAGMENT_LABEL_COLUMNS, wording(label)))
+        if options:
+            list_name = f"{qname}_list"
+            row["type"] = f"{q_type} {list_name}"
+            lists[list_name] = tuple(
+                (str(idx), sq, tuple(zip(FRAGMENT_LABEL_COLUMNS[1:], translations)))
+                for idx, (sq, *translations) in enumerate(map(wording, options), 1)
+            )
+        if relevant:
+            row["relevant"] = relevant
+        survey.append(row)
+
+    return {"name": name.lower(), "version": version, "survey": survey, "lists": lists}
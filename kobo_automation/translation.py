@@ -0,0 +1,618 @@
+"""
+Batch translation of Excel columns and Word documents with Gemini.
+
+Texts are sent as `[N] text` lines and the model replies with `[N] translation`
+lines, which are matched back to their rows by N (`[N][lang]` when one request
+carries several target languages). Batches are packed by the estimated size of
+their reply, so long questions do not overflow MAX_OUTPUT_TOKENS and short labels
+share a request; indices missing from a reply are asked for again on their own,
+split further when the reply was cut off. Batches are dispatched MAX_WORKERS at a
+time within the RPM/TPM quota, and 429 replies are retried after the delay the API
+asks for. Repeated texts are sent once per run and texts already in the
+translation memory are not sent at all. With a checkpoint, every finished batch is
+saved as it arrives, so a failed run resumes where it stopped and a failing batch
+does not discard the others. With a glossary, each prompt lists the glossary terms
+found in its own batch.
+
+Replies are streamed: every `[N]` line is applied to its text as soon as it
+arrives, progress moves per translation, and the lines received before a stream
+breaks are kept while the rest of the batch goes to the repair pass.
+"""
+import queue
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from kobo_automation.gemini import (
+    LANG_NAMES, TRANSLATION_RPM, TRANSLATION_TPM, RateLimiter,
+    generation_config, is_rate_limit_error, is_truncated, retry_delay_seconds, usage_tokens
+)
+
+MAX_BATCH_ITEMS = 150
+MAX_OUTPUT_TOKENS = 4096
+# Share of MAX_OUTPUT_TOKENS a batch is packed to, since the estimate is rough
+OUTPUT_TOKEN_BUDGET = 3000
+# Translations into Albanian and the Slavic languages run longer than the source
+OUTPUT_EXPANSION = 1.5
+MAX_REPAIR_ROUNDS = 2
+MAX_WORKERS = 4
+MAX_RETRIES = 5
+CHARS_PER_TOKEN = 4
+
+TRANSLATION_LINE_PATTERN = re.compile(r"\[(\d+)\]\s*(.*)")
+MULTI_TRANSLATION_LINE_PATTERN = re.compile(r"\[(\d+)\]\s*\[(\w+)\]\s*(.*)")
+
+
+def adjust_question_code(text, from_lang, to_lang):
+    match = re.match(r'^(Q\d+[a-zA-Z]?|P\d+[a-zA-Z]?)(.*)', str(text))
+    if match:
+        code = match.group(1)
+        rest = match.group(2)
+        if from_lang == "en" and to_lang in ["sq", "sr", "mk"]:
+            code = code.replace("Q", "P")
+        elif from_lang == "sq" and to_lang == "en":
+            code = code.replace("P", "Q")
+        elif from_lang == "en" and to_lang == "sr":
+            code = code.replace("Q", "P")
+        return code, rest
+    else:
+        return '', text
+
+
+def parse_numbered_translations(text):
+    """Map N → translation for every `[N] translation` line of a reply."""
+    translations = {}
+    for line in text.strip().split("\n"):
+        m = TRANSLATION_LINE_PATTERN.match(line.strip())
+        if m:
+            translations[int(m.group(1))] = m.group(2).strip()
+    return translations
+
+
+def parse_multi_translations(text, to_langs):
+    """Map lang → N → translation for every `[N][lang] translation` line of a reply."""
+    translations = {lang: {} for lang in to_langs}
+    for line in text.strip().split("\n"):
+        m = MULTI_TRANSLATION_LINE_PATTERN.match(line.strip())
+        if m and m.group(2).lower() in translations:
+            translations[m.group(2).lower()][int(m.group(1))] = m.group(3).strip()
+    return translations
+
+
+def chunk_text(chunk):
+    # A chunk carrying only a finish reason has no text parts
+    try:
+        return chunk.text
+    except ValueError:
+        return ""
+
+
+def stream_reply(model, prompt, on_line):
+    """
+    Stream a generate_content reply, calling on_line(line) for every line as soon as
+    it is complete. A reply cut off at max_output_tokens loses its unfinished last
+    line; a stream that breaks after some lines counts as cut off, so the lines
+    already received are kept, and its tokens, which are billed all the same, are
+    read from the partial response or else estimated from the prompt and those
+    lines. Returns (in_tok, out_tok, truncated).
+    """
+    response = model.generate_content(
+        prompt,
+        generation_config=generation_config(temperature=0.1, max_output_tokens=MAX_OUTPUT_TOKENS),
+        stream=True,
+    )
+    buffer = ""
+    received = 0
+    received_chars = 0
+    try:
+        for chunk in response:
+            *lines, buffer = (buffer + chunk_text(chunk)).split("\n")
+            for line in lines:
+                on_line(line)
+            received += len(lines)
+            received_chars += sum(len(line) + 1 for line in lines)
+    except Exception:
+        if not received:
+            raise
+        try:
+            in_tok, out_tok = usage_tokens(response)
+        except Exception:
+            in_tok, out_tok = 0, 0
+        return (
+            in_tok or len(prompt) // CHARS_PER_TOKEN,
+            out_tok or received_chars // CHARS_PER_TOKEN,
+            True,
+        )
+
+    truncated = is_truncated(response)
+    if buffer.strip() and not truncated:
+        on_line(buffer)
+    in_tok, out_tok = usage_tokens(response)
+    return in_tok, out_tok, truncated
+
+
+def glossary_instruction(glossary, texts, from_lang, to_langs):
+    """Prompt line with the glossary terms that occur in `texts`, or an empty string."""
+    if glossary is None:
+        return ""
+    terms = glossary.terms_for(texts, from_lang, to_langs)
+    if not terms:
+        return ""
+    if len(to_langs) == 1:
+        listed = "; ".join(f"{term} = {targets[to_langs[0]]}" for term, targets in terms)
+    else:
+        listed = "; ".join(
+            f"{term} = " + ", ".join(f"[{lang}] {target}" for lang, target in targets.items())
+            for term, targets in terms
+        )
+    return f"\nUse these terms: {listed}."
+
+
+def translate_batch(model, texts, from_lang, to_lang, glossary=None, on_item=None):
+    """
+    Translate a batch of texts in one API call, calling on_item(to_lang, N,
+    translation) for each line as it streams in.
+    Returns (translations_dict, in_tok, out_tok, truncated).
+    """
+    from_name = LANG_NAMES.get(from_lang, from_lang)
+    to_name = LANG_NAMES.get(to_lang, to_lang)
+    terms = glossary_instruction(glossary, texts, from_lang, (to_lang,))
+
+    numbered_texts = "\n".join(f"[{j+1}] {t}" for j, t in enumerate(texts))
+    prompt = (
+        f"{from_name} to {to_name}. Reply [N] translation only.{terms}\n\n{numbered_texts}"
+    )
+
+    translations = {}
+
+    def on_line(line):
+        for number, translation in parse_numbered_translations(line).items():
+            if 1 <= number <= len(texts):
+                translations[number] = translation
+                if on_item:
+                    on_item(to_lang, number, translation)
+
+    in_tok, out_tok, truncated = stream_reply(model, prompt, on_line)
+    return translations, in_tok, out_tok, truncated
+
+
+def translate_batch_multi(model, texts, from_lang, to_langs, glossary=None, on_item=None):
+    """
+    Translate a batch into several languages in one API call, calling
+    on_item(lang, N, translation) for each line as it streams in.
+    Returns ({lang: translations_dict}, in_tok, out_tok, truncated).
+    """
+    from_name = LANG_NAMES.get(from_lang, from_lang)
+    targets = ", ".join(f"{LANG_NAMES.get(lang, lang)} [{lang}]" for lang in to_langs)
+    terms = glossary_instruction(glossary, texts, from_lang, to_langs)
+
+    numbered_texts = "\n".join(f"[{j+1}] {t}" for j, t in enumerate(texts))
+    prompt = (
+        f"{from_name} to {targets}. Reply [N][code] translation only, one line per text and language.{terms}\n\n{numbered_texts}"
+    )
+
+    translations = {lang: {} for lang in to_langs}
+
+    def on_line(line):
+        for lang, numbered in parse_multi_translations(line, to_langs).items():
+            for number, translation in numbered.items():
+                if 1 <= number <= len(texts):
+                    translations[lang][number] = translation
+                    if on_item:
+                        on_item(lang, number, translation)
+
+    in_tok, out_tok, truncated = stream_reply(model, prompt, on_line)
+    return translations, in_tok, out_tok, truncated
+
+
+def estimate_batch_tokens(texts, languages=1):
+    """Rough prompt plus reply tokens of a batch, charged against the TPM limit."""
+    prompt_tokens = sum(len(text) for text in texts) // CHARS_PER_TOKEN + 4 * len(texts) + 20
+    return prompt_tokens + sum(estimate_output_tokens(text, languages) for text in texts)
+
+
+def estimate_output_tokens(text, languages=1):
+    """Rough reply tokens for one text: its translations plus the `[N][lang]` prefixes."""
+    return int((len(text) / CHARS_PER_TOKEN * OUTPUT_EXPANSION + 6) * languages)
+
+
+def pack_batches(texts, languages=1, budget=OUTPUT_TOKEN_BUDGET, max_items=MAX_BATCH_ITEMS):
+    """
+    Split positions into texts into consecutive batches whose estimated reply fits
+    `budget` tokens, at most `max_items` each. A text too long for the budget on
+    its own gets a batch of its own.
+    """
+    batches = []
+    batch, batch_tokens = [], 0
+    for position, text in enumerate(texts):
+        tokens = estimate_output_tokens(text, languages)
+        if batch and (batch_tokens + tokens > budget or len(batch) >= max_items):
+            batches.append(batch)
+            batch, batch_tokens = [], 0
+        batch.append(position)
+        batch_tokens += tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def translate_batch_with_backoff(model, texts, from_lang, to_langs, limiter=None, glossary=None, on_item=None):
+    """
+    translate_batch (one language) or translate_batch_multi within the limiter's
+    quota, retrying rate-limit errors.
+    Returns ({lang: translations_dict}, in_tok, out_tok, truncated).
+    """
+    for attempt in range(MAX_RETRIES):
+        if limiter:
+            limiter.acquire(estimate_batch_tokens(texts, len(to_langs)))
+        try:
+            if len(to_langs) == 1:
+                translations, in_tok, out_tok, truncated = translate_batch(
+                    model, texts, from_lang, to_langs[0], glossary, on_item
+                )
+                return {to_langs[0]: translations}, in_tok, out_tok, truncated
+            return translate_batch_multi(model, texts, from_lang, to_langs, glossary, on_item)
+        except Exception as e:
+            if not is_rate_limit_error(e) or attempt == MAX_RETRIES - 1:
+                raise
+            time.sleep(retry_delay_seconds(e, attempt))
+
+
+def translate_batch_with_repair(model, texts, from_lang, to_langs, limiter=None, glossary=None, on_item=None):
+    """
+    translate_batch_with_backoff, then up to MAX_REPAIR_ROUNDS follow-up requests
+    for only the texts and languages missing from the replies. The missing texts of
+    a cut-off reply are split in two, so each half gets the whole output budget.
+    on_item(lang, N, translation) receives every streamed line.
+    Returns ({lang: translations_dict}, in_tok, out_tok); N and the dict keys are
+    1-based into `texts`.
+    """
+    translations = {lang: {} for lang in to_langs}
+    total_in, total_out = 0, 0
+    pending = [list(range(len(texts)))]
+    for _ in range(MAX_REPAIR_ROUNDS + 1):
+        retry = []
+        for positions in pending:
+            langs = tuple(
+                lang for lang in to_langs if any(p + 1 not in translations[lang] for p in positions)
+            )
+            # Streamed numbers are relative to this request's texts
+            forward = (
+                (lambda lang, number, translation, positions=positions:
+                    on_item(lang, positions[number - 1] + 1, translation))
+                if on_item else None
+            )
+            reply, in_tok, out_tok, truncated = translate_batch_with_backoff(
+                model, [texts[p] for p in positions], from_lang, langs, limiter, glossary, forward
+            )
+            total_in += in_tok
+            total_out += out_tok
+            for lang in langs:
+                for j, p in enumerate(positions):
+                    if reply.get(lang, {}).get(j + 1):
+                        translations[lang][p + 1] = reply[lang][j + 1]
+
+            missing = [p for p in positions if any(p + 1 not in translations[lang] for lang in langs)]
+            if truncated and len(missing) > 1:
+                half = len(missing) // 2
+                retry.extend([missing[:half], missing[half:]])
+            elif missing:
+                retry.append(missing)
+        if not retry:
+            break
+        pending = retry
+    return translations, total_in, total_out
+
+
+def dispatch_batches(model, jobs, from_lang, max_workers=MAX_WORKERS, rpm=TRANSLATION_RPM, tpm=TRANSLATION_TPM,
+                     glossary=None, stores=()):
+    """
+    Translate (texts, to_langs) jobs concurrently. Yields (job_index, item, result,
+    error) events in arrival order: item (lang, N, translation) for every streamed
+    line, then one event with item None when the job ends, result being
+    translate_batch_with_repair's tuple or None when `error` is set. Runs in the
+    caller's thread between yields, so callers can update the UI there.
+    Each job's translations, including those streamed before a failure, are saved
+    to `stores` (TranslationCheckpoint, TranslationMemory) by the worker itself, so
+    they are kept even when the caller stops consuming; a store that fails is
+    reported as the job's error.
+    """
+    limiter = RateLimiter(rpm, tpm) if rpm or tpm else None
+    events = queue.Queue()
+
+    def run(idx, texts, to_langs):
+        streamed = {lang: {} for lang in to_langs}
+
+        def on_item(lang, number, translation):
+            streamed[lang][number] = translation
+            events.put((idx, (lang, number, translation), None, None))
+
+        result = error = None
+        try:
+            result = translate_batch_with_repair(model, texts, from_lang, to_langs, limiter, glossary, on_item)
+        except Exception as e:
+            error = e
+        # Every job ends with exactly one event, or the caller waits for it forever
+        try:
+            save(texts, streamed if error else result[0])
+        except Exception as e:
+            error = error or e
+        finally:
+            events.put((idx, None, None if error else result, error))
+
+    def save(texts, translations):
+        for lang, numbered in translations.items():
+            pairs = [(texts[number - 1], translation) for number, translation in numbered.items()]
+            for store in stores:
+                if store is not None and pairs:
+                    store.store(pairs, from_lang, lang)
+
+    pool = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        for idx, (texts, to_langs) in enumerate(jobs):
+            pool.submit(run, idx, texts, to_langs)
+        remaining = len(jobs)
+        while remaining:
+            event = events.get()
+            if event[1] is None:
+                remaining -= 1
+            yield event
+    finally:
+        # A caller that stops early (a Streamlit rerun) must not keep spending quota
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def translate_texts_multi(model, texts, from_lang, to_langs, on_progress=None, memory=None, stats=None,
+                          max_workers=MAX_WORKERS, rpm=TRANSLATION_RPM, tpm=TRANSLATION_TPM,
+                          checkpoint=None, glossary=None):
+    """
+    Translate a list of texts into every language of `to_langs`, each batch asking for
+    all the languages a text still misses in one request. Identical texts are
+    collapsed first; the unique ones are taken from `memory` (a TranslationMemory)
+    where possible and new translations are stored back. `on_progress(done, total)`
+    counts the translations asked of the model, moving as each one streams in.
+    `checkpoint` (a TranslationCheckpoint) is consulted before the memory and, like
+    the memory, receives every batch from its worker as soon as it completes. The
+    number of texts, of unique texts and of translations resumed from the checkpoint
+    are added to `stats` ("texts", "unique", "resumed") when given. `glossary` (a
+    glossary.Glossary) adds the terms found in each batch to its prompt.
+    Returns ({lang: translations}, in_tokens, out_tokens, errors) with every
+    translations list aligned to `texts`, None where a batch failed before the
+    translation arrived.
+    """
+    to_langs = tuple(dict.fromkeys(to_langs))
+    all_texts = texts
+    texts = list(dict.fromkeys(all_texts))
+    if stats is not None:
+        stats["texts"] = stats.get("texts", 0) + len(all_texts)
+        stats["unique"] = stats.get("unique", 0) + len(texts)
+
+    total_in, total_out = 0, 0
+    errors = []
+    translations = {lang: [None] * len(texts) for lang in to_langs}
+
+    # Texts grouped by the languages they still miss
+    missing = {}
+    for lang in to_langs:
+        remembered = checkpoint.lookup(texts, from_lang, lang) if checkpoint is not None else {}
+        if stats is not None:
+            stats["resumed"] = stats.get("resumed", 0) + len(remembered)
+        if memory is not None:
+            remembered.update(memory.lookup([text for text in texts if text not in remembered], from_lang, lang))
+        for i, text in enumerate(texts):
+            if text in remembered:
+                translations[lang][i] = remembered[text]
+    for i in range(len(texts)):
+        langs = tuple(lang for lang in to_langs if translations[lang][i] is None)
+        if langs:
+            missing.setdefault(langs, []).append(i)
+
+    # Batches packed by reply size, so a request carrying several languages holds fewer texts
+    jobs = []
+    for langs, pending in missing.items():
+        for positions in pack_batches([texts[i] for i in pending], len(langs)):
+            jobs.append((langs, [pending[p] for p in positions]))
+
+    total = sum(len(batch) * len(langs) for langs, batch in jobs)
+    done = 0
+    streamed = [set() for _ in jobs]
+    dispatched = dispatch_batches(
+        model, [([texts[i] for i in batch], langs) for langs, batch in jobs], from_lang, max_workers, rpm, tpm,
+        glossary, (checkpoint, memory)
+    )
+    for job_index, item, result, error in dispatched:
+        langs, batch = jobs[job_index]
+
+        # Texts are addressed by index, so arrival order does not matter
+        if item:
+            lang, number, translation = item
+            translations[lang][batch[number - 1]] = translation
+            if (lang, number) not in streamed[job_index]:
+                streamed[job_index].add((lang, number))
+                done += 1
+                if on_progress:
+                    on_progress(done, total)
+            continue
+
+        if error:
+            errors.append(str(error))
+        else:
+            batch_translations, in_tok, out_tok = result
+            total_in += in_tok
+            total_out += out_tok
+            for lang in langs:
+                for j, i in enumerate(batch):
+                    if (j + 1) in batch_translations.get(lang, {}):
+                        translations[lang][i] = batch_translations[lang][j + 1]
+
+        done += len(batch) * len(langs) - len(streamed[job_index])
+        if on_progress:
+            on_progress(done, total)
+
+    # Fan the unique translations back out to every occurrence
+    fanned_out = {}
+    for lang in to_langs:
+        by_text = dict(zip(texts, translations[lang]))
+        fanned_out[lang] = [by_text[text] for text in all_texts]
+    return fanned_out, total_in, total_out, errors
+
+
+def translate_texts(model, texts, from_lang, to_lang, on_progress=None, memory=None, stats=None,
+                    max_workers=MAX_WORKERS, rpm=TRANSLATION_RPM, tpm=TRANSLATION_TPM,
+                    checkpoint=None, glossary=None):
+    """
+    translate_texts_multi for a single language.
+    Returns (translations, in_tokens, out_tokens, errors).
+    """
+    translations, total_in, total_out, errors = translate_texts_multi(
+        model, texts, from_lang, (to_lang,), on_progress, memory, stats,
+        max_workers, rpm, tpm, checkpoint, glossary
+    )
+    return translations[to_lang], total_in, total_out, errors
+
+
+def translate_dataframe(df, source_col, target_col, from_lang, to_lang, model, on_progress=None, memory=None, stats=None,
+                        max_workers=MAX_WORKERS, rpm=TRANSLATION_RPM, tpm=TRANSLATION_TPM,
+                        checkpoint=None, glossary=None):
+    """
+    Translate `source_col` into `target_col` with translate_texts. Question codes
+    (Q1/P1) are kept out of the prompt and re-prefixed in the target convention.
+    Rows whose translation failed keep the target column's current value.
+    Returns (df, in_tokens, out_tokens, errors).
+    """
+    import pandas as pd
+
+    results = list(df[source_col].values)
+    current = list(df[target_col].values) if target_col in df.columns else [None] * len(df)
+
+    # Collect texts that need translation
+    to_translate = []
+    for i, val in enumerate(results):
+        if pd.isna(val) or not str(val).strip() or str(val).strip().lower() == "none":
+            continue
+        code, remaining = adjust_question_code(str(val), from_lang, to_lang)
+        if not remaining.strip():
+            results[i] = code + remaining
+            continue
+        results[i] = current[i]
+        to_translate.append((i, code, remaining.strip()))
+
+    if not to_translate:
+        df[target_col] = results
+        return df, 0, 0, []
+
+    translations, total_in, total_out, errors = translate_texts(
+        model, [text for _, _, text in to_translate], from_lang, to_lang, on_progress, memory, stats,
+        max_workers, rpm, tpm, checkpoint, glossary
+    )
+    for (idx, code, _), translated in zip(to_translate, translations):
+        if translated is not None:
+            results[idx] = code + translated
+
+    df[target_col] = results
+    return df, total_in, total_out, errors
+
+
+def translate_dataframe_multi(df, source_col, targets, from_lang, model, on_progress=None, memory=None, stats=None,
+                              max_workers=MAX_WORKERS, rpm=TRANSLATION_RPM, tpm=TRANSLATION_TPM,
+                              checkpoint=None, glossary=None):
+    """
+    Translate `source_col` into several (target_col, to_lang) columns at once with
+    translate_texts_multi, so each source text is sent once for all languages.
+    Rows whose translation failed keep the target column's current value.
+    Returns (df, in_tokens, out_tokens, errors).
+    """
+    import pandas as pd
+
+    sources = list(df[source_col].values)
+    columns = {target_col: list(sources) for target_col, _ in targets}
+    current = {
+        target_col: list(df[target_col].values) if target_col in df.columns else [None] * len(df)
+        for target_col, _ in targets
+    }
+
+    # Collect texts that need translation; the question code depends on the target language
+    to_translate = []
+    for i, val in enumerate(sources):
+        if pd.isna(val) or not str(val).strip() or str(val).strip().lower() == "none":
+            continue
+        adjusted = {to_lang: adjust_question_code(str(val), from_lang, to_lang) for _, to_lang in targets}
+        codes = {to_lang: code for to_lang, (code, _) in adjusted.items()}
+        remaining = next(iter(adjusted.values()))[1]
+        if not remaining.strip():
+            for target_col, to_lang in targets:
+                columns[target_col][i] = codes[to_lang] + remaining
+            continue
+        for target_col, _ in targets:
+            columns[target_col][i] = current[target_col][i]
+        to_translate.append((i, codes, remaining.strip()))
+
+    total_in, total_out, errors = 0, 0, []
+    if to_translate:
+        translations, total_in, total_out, errors = translate_texts_multi(
+            model, [text for _, _, text in to_translate], from_lang, [to_lang for _, to_lang in targets],
+            on_progress, memory, stats, max_workers, rpm, tpm, checkpoint, glossary
+        )
+        for target_col, to_lang in targets:
+            for (idx, codes, _), translated in zip(to_translate, translations[to_lang]):
+                if translated is not None:
+                    columns[target_col][idx] = codes[to_lang] + translated
+
+    for target_col, _ in targets:
+        df[target_col] = columns[target_col]
+    return df, total_in, total_out, errors
+
+
+def docx_paragraph_entries(doc):
+    """Non-empty paragraphs of a python-docx Document, body first and then table cells."""
+    # Collect full paragraph text (not individual runs) for better translation
+    # Each entry: (kind, paragraph, full_text)
+    para_entries = []
+
+    for para in doc.paragraphs:
+        text = para.text.strip()
+        if text:
+            para_entries.append(("para", para, text))
+
+    for table in doc.tables:
+        for row in table.rows:
+            for cell in row.cells:
+                for para in cell.paragraphs:
+                    text = para.text.strip()
+                    if text:
+                        para_entries.append(("cell", para, text))
+
+    return para_entries
+
+
+def set_paragraph_text(para, translated):
+    # Put all translated text in first run, clear the rest
+    if para.runs:
+        para.runs[0].text = translated
+        for run in para.runs[1:]:
+            run.text = ""
+    else:
+        para.text = translated
+
+
+def translate_docx_in_place(doc, from_lang, to_lang, model, on_progress=None, memory=None, stats=None,
+                            max_workers=MAX_WORKERS, rpm=TRANSLATION_RPM, tpm=TRANSLATION_TPM,
+                            checkpoint=None, glossary=None):
+    """
+    Translate every paragraph of a python-docx Document in place with translate_texts.
+    Returns (doc, in_tokens, out_tokens, errors).
+    """
+    para_entries = docx_paragraph_entries(doc)
+    if not para_entries:
+        return doc, 0, 0, []
+
+    translations, total_in, total_out, errors = translate_texts(
+        model, [text for _, _, text in para_entries], from_lang, to_lang, on_progress, memory, stats,
+        max_workers, rpm, tpm, checkpoint, glossary
+    )
+    # Paragraphs are only touched here, in the caller's thread
+    for (_, para, _), translated in zip(para_entries, translations):
+        if translated is not None:
+            set_paragraph_text(para, translated)
+
+    return doc, total_in, total_out, errors
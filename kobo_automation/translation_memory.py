@@ -0,0 +1,121 @@
+"""
+On-disk translation memory shared by the Excel and Word translation pages.
+
+Translations are stored in SQLite keyed by the whitespace-normalized source text,
+the language pair and the model, so a revised questionnaire only sends the lines
+that changed. Every call opens its own connection, which keeps the memory safe to
+use from any Streamlit session thread.
+
+TranslationCheckpoint keeps the translations of one job (a workbook, sheet and
+source column) in a table of its own, written after every batch, so a run that
+dies partway resumes with the texts it has not translated yet.
+"""
+import os
+import sqlite3
+import tempfile
+import time
+from contextlib import closing, contextmanager
+
+TRANSLATION_MEMORY_PATH = os.environ.get(
+    "KOBO_TRANSLATION_MEMORY", os.path.join(tempfile.gettempdir(), "kobo_translation_memory.sqlite")
+)
+# SQLite's default limit on bound parameters is 999
+LOOKUP_CHUNK_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS {table} (
+    source TEXT NOT NULL,
+    from_lang TEXT NOT NULL,
+    to_lang TEXT NOT NULL,
+    model TEXT NOT NULL,
+    target TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (source, from_lang, to_lang, model)
+)
+"""
+
+
+def normalize_source(text):
+    return " ".join(str(text).split())
+
+
+class TranslationMemory:
+    """
+    Translation memory for one model. `hits` and `misses` count the texts looked up
+    since the last reset_stats(), for the hit-rate shown next to the cost info.
+    """
+    table = "translations"
+
+    def __init__(self, model, path=TRANSLATION_MEMORY_PATH):
+        self.model = model
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        with self.connect() as conn:
+            conn.execute(SCHEMA.format(table=self.table))
+
+    @contextmanager
+    def connect(self):
+        """A connection that commits on success and is closed afterwards."""
+        with closing(sqlite3.connect(self.path, timeout=30)) as conn:
+            with conn:
+                yield conn
+
+    def lookup(self, texts, from_lang, to_lang):
+        """{text: translation} for the texts already in memory."""
+        unique_keys = list(dict.fromkeys(normalize_source(text) for text in texts))
+        found = {}
+        with self.connect() as conn:
+            for start in range(0, len(unique_keys), LOOKUP_CHUNK_SIZE):
+                chunk = unique_keys[start:start + LOOKUP_CHUNK_SIZE]
+                rows = conn.execute(
+                    f"SELECT source, target FROM {self.table} WHERE from_lang = ? AND to_lang = ? AND model = ? "
+                    f"AND source IN ({', '.join('?' * len(chunk))})",
+                    [from_lang, to_lang, self.model, *chunk]
+                )
+                for source, target in rows:
+                    found[source] = target
+
+        translations = {text: found[normalize_source(text)] for text in texts if normalize_source(text) in found}
+        self.hits += len(translations)
+        self.misses += len(texts) - len(translations)
+        return translations
+
+    def store(self, pairs, from_lang, to_lang):
+        """Remember (source_text, translation) pairs, replacing older entries."""
+        now = time.time()
+        rows = [
+            (normalize_source(source), from_lang, to_lang, self.model, target, now)
+            for source, target in pairs if target
+        ]
+        if not rows:
+            return
+        with self.connect() as conn:
+            conn.executemany(f"INSERT OR REPLACE INTO {self.table} VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+
+def checkpoint_job(workbook_hash, sheet, source_col):
+    return f"{workbook_hash}:{sheet}:{source_col}"
+
+
+class TranslationCheckpoint(TranslationMemory):
+    """
+    Translations done so far by one job, stored under the job key in place of the
+    model. Looked up before the memory and cleared once the job completes.
+    """
+    table = "checkpoints"
+
+    def __init__(self, job, path=TRANSLATION_MEMORY_PATH):
+        super().__init__(job, path)
+
+    def clear(self):
+        with self.connect() as conn:
+            conn.execute(f"DELETE FROM {self.table} WHERE model = ?", [self.model])
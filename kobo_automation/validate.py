@@ -0,0 +1,105 @@
+"""
+Local XLSForm checks run before a generated form is offered for download.
+
+Catches the mistakes Kobo would otherwise reject at upload time (or Collect would
+crash on in the field) in one linear pass over the survey/choices rows.
+"""
+import re
+
+REFERENCE_PATTERN = re.compile(r"\$\{([^}]*)\}")
+REFERENCE_COLUMNS = ["label", "hint", "relevant", "constraint", "calculation", "choice_filter", "required", "repeat_count"]
+SELECT_TYPES = {"select_one", "select_multiple", "rank"}
+SELECT_FROM_FILE_TYPES = {"select_one_from_file", "select_multiple_from_file"}
+GROUP_TYPES = {
+    "begin_group": "end_group", "begin group": "end group",
+    "begin_repeat": "end_repeat", "begin repeat": "end repeat"
+}
+GROUP_ENDS = {end: begin for begin, end in GROUP_TYPES.items()}
+
+def sheet_row(index):
+    """Spreadsheet row number of a data row (row 1 is the header)."""
+    return index + 2
+
+def validate_xlsform(survey, choices, attachments=None):
+    """
+    Check survey/choices rows as produced by build_xlsform.
+    `attachments` are the form's external choice files; when given, *_from_file
+    questions must name one of them.
+    Returns a list of (sheet, row, message) tuples, one per problem, survey rows
+    first and then choices, by row; an empty list means the form passed every check.
+    """
+    problems = []
+
+    # Choice lists and duplicate option names within a list
+    list_options = {}
+    for index, choice in enumerate(choices):
+        list_name = choice.get("list_name")
+        name = str(choice.get("name"))
+        options = list_options.setdefault(list_name, {})
+        if name in options:
+            problems.append(("choices", sheet_row(index), f"opsioni '{name}' është i dyfishtë në listën '{list_name}' (rreshti {options[name]})"))
+        else:
+            options[name] = sheet_row(index)
+
+    # Field names, first occurrence wins
+    field_rows = {}
+    for index, row in enumerate(survey):
+        name = row.get("name")
+        if not name:
+            if row.get("type") not in GROUP_ENDS:
+                problems.append(("survey", sheet_row(index), f"rreshti i tipit '{row.get('type')}' nuk ka emër"))
+            continue
+        if name in field_rows:
+            problems.append(("survey", sheet_row(index), f"emri '{name}' është i dyfishtë (rreshti {field_rows[name]})"))
+        else:
+            field_rows[name] = sheet_row(index)
+
+    open_groups = []
+    for index, row in enumerate(survey):
+        row_number = sheet_row(index)
+        q_type = (row.get("type") or "").strip()
+        parts = q_type.split()
+
+        # select_one / select_multiple / rank must point at an existing list
+        if parts and parts[0] in SELECT_TYPES:
+            if len(parts) < 2:
+                problems.append(("survey", row_number, f"tipi '{q_type}' nuk ka emër liste"))
+            elif parts[1] not in list_options:
+                problems.append(("survey", row_number, f"lista '{parts[1]}' nuk ekziston në choices"))
+
+        # select_*_from_file must point at a shipped CSV
+        if parts and parts[0] in SELECT_FROM_FILE_TYPES and attachments is not None:
+            if len(parts) < 2:
+                problems.append(("survey", row_number, f"tipi '{q_type}' nuk ka emër skedari"))
+            elif parts[1] not in attachments:
+                problems.append(("survey", row_number, f"skedari '{parts[1]}' nuk është pjesë e formularit"))
+
+        # ${...} references must name a field of the form
+        for column in REFERENCE_COLUMNS:
+            value = row.get(column)
+            if not isinstance(value, str) or "${" not in value:
+                continue
+            for ref in REFERENCE_PATTERN.findall(value):
+                if ref not in field_rows:
+                    problems.append(("survey", row_number, f"'{column}' i referohet fushës së panjohur ${{{ref}}}"))
+
+        # begin/end group and repeat balance
+        if q_type in GROUP_TYPES:
+            open_groups.append((q_type, row_number))
+        elif q_type in GROUP_ENDS:
+            if not open_groups:
+                problems.append(("survey", row_number, f"'{q_type}' pa '{GROUP_ENDS[q_type]}' përkatës"))
+            else:
+                begin_type, begin_row = open_groups.pop()
+                if GROUP_TYPES[begin_type] != q_type:
+                    problems.append(("survey", row_number, f"'{q_type}' mbyll '{begin_type}' të rreshtit {begin_row}"))
+
+    for begin_type, begin_row in open_groups:
+        problems.append(("survey", begin_row, f"'{begin_type}' nuk mbyllet kurrë"))
+
+    problems.sort(key=lambda problem: (problem[0] != "survey", problem[1]))
+    return problems
+
+def format_problem(problem):
+    sheet, row, message = problem
+    return f"{sheet}, rreshti {row}: {message}"
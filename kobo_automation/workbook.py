@@ -0,0 +1,183 @@
+"""
+Write translated cells back into an uploaded .xlsx without re-serializing it.
+
+DataFrame.to_excel rewrites every sheet and loses styles, column widths, data
+validation and anything pandas did not read. patch_workbook instead rewrites only
+the <c> elements of the changed cells, as inline strings, in the XML of the sheets
+that have them; every other part of the package is copied unchanged.
+
+Cells are addressed the way read_excel lays a sheet out: the header on row 1 and
+DataFrame row i on row i + 2, column j on column j + 1.
+"""
+import numbers
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from io import BytesIO
+from xml.sax.saxutils import escape
+
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+
+SHEET_DATA_PATTERN = re.compile(r"<sheetData\s*/>|<sheetData\b[^>]*>(.*?)</sheetData>", re.S)
+ROW_PATTERN = re.compile(r"<row\b([^>]*?)(?:/>|>(.*?)</row>)", re.S)
+CELL_PATTERN = re.compile(r"<c\b([^>]*?)(?:/>|>(.*?)</c>)", re.S)
+REF_ATTR_PATTERN = re.compile(r'\br="([A-Z]*)(\d+)"')
+STYLE_ATTR_PATTERN = re.compile(r'\bs="(\d+)"')
+SPANS_ATTR_PATTERN = re.compile(r'\s+spans="[^"]*"')
+ILLEGAL_XML_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def column_letter(index):
+    """1 → A, 27 → AA."""
+    letters = ""
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def column_index(letters):
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - 64
+    return index
+
+
+def changed_cells(original, translated, columns):
+    """
+    {(row, column): value} for the cells of `columns` whose value in `translated`
+    differs from `original`, in sheet coordinates. Only the given columns are compared.
+    """
+    cells = {}
+    for column in columns:
+        if column not in original.columns or column not in translated.columns:
+            continue
+        position = original.columns.get_loc(column)
+        if not isinstance(position, int):
+            continue
+        before, after = original[column], translated[column]
+        changed = after.notna() & ~((before == after) | (before.isna() & after.isna()))
+        for row in changed.to_numpy().nonzero()[0]:
+            cells[(int(row) + 2, position + 1)] = after.iloc[row]
+    return cells
+
+
+def sheet_parts(package):
+    """{sheet_name: path of its XML part} from the workbook's relationships."""
+    try:
+        rels = ET.fromstring(package.read("_rels/.rels"))
+        workbook_path = next(
+            rel.get("Target") for rel in rels if rel.get("Type", "").endswith("/officeDocument")
+        ).lstrip("/")
+        base = posixpath.dirname(workbook_path)
+        workbook_rels = ET.fromstring(package.read(f"{base}/_rels/{posixpath.basename(workbook_path)}.rels"))
+        workbook = ET.fromstring(package.read(workbook_path))
+    except (KeyError, StopIteration, ET.ParseError) as e:
+        raise ValueError(f"Struktura e workbook-ut nuk njihet ({e})")
+
+    targets = {rel.get("Id"): rel.get("Target") for rel in workbook_rels}
+    parts = {}
+    for sheet in workbook.iter(f"{{{MAIN_NS}}}sheet"):
+        target = targets.get(sheet.get(f"{{{REL_NS}}}id"))
+        if target:
+            parts[sheet.get("name")] = (
+                target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join(base, target))
+            )
+    return parts
+
+
+def cell_xml(row, column, value, attrs=""):
+    """A <c> element for `value`, keeping the style of the cell it replaces."""
+    style = STYLE_ATTR_PATTERN.search(attrs)
+    style = f' s="{style.group(1)}"' if style else ""
+    ref = f"{column_letter(column)}{row}"
+    if isinstance(value, numbers.Number) and not isinstance(value, bool):
+        return f'<c r="{ref}"{style}><v>{value}</v></c>'
+    text = escape(ILLEGAL_XML_CHARS.sub("", str(value)))
+    return f'<c r="{ref}"{style} t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def splice_sorted(body, pattern, number_of, updates, render):
+    """
+    Walk the elements of `body` matched by `pattern`, which are ordered by
+    number_of(match), replacing the ones in `updates` with render(number, match) and
+    inserting the missing ones in order with render(number, None).
+    """
+    pending = sorted(updates)
+    k = 0
+    out = []
+    pos = 0
+    for match in pattern.finditer(body):
+        number = number_of(match)
+        out.append(body[pos:match.start()])
+        while k < len(pending) and pending[k] < number:
+            out.append(render(pending[k], None))
+            k += 1
+        if k < len(pending) and pending[k] == number:
+            out.append(render(number, match))
+            k += 1
+        else:
+            out.append(match.group(0))
+        pos = match.end()
+    out.append(body[pos:])
+    out.extend(render(number, None) for number in pending[k:])
+    return "".join(out)
+
+
+def element_number(match, column=False):
+    ref = REF_ATTR_PATTERN.search(match.group(1))
+    if not ref:
+        raise ValueError("Rreshti ose qeliza pa atributin r nuk mund të ndryshohet")
+    return column_index(ref.group(1)) if column else int(ref.group(2))
+
+
+def patch_sheet_xml(xml, cells):
+    """The sheet XML with `cells` ({(row, column): value}) written in; the rest untouched."""
+    sheet_data = SHEET_DATA_PATTERN.search(xml)
+    if not sheet_data:
+        raise ValueError("Faqja nuk ka <sheetData>")
+
+    by_row = {}
+    for (row, column), value in cells.items():
+        by_row.setdefault(row, {})[column] = value
+
+    def render_row(number, match):
+        row_cells = by_row[number]
+        attrs = SPANS_ATTR_PATTERN.sub("", match.group(1)) if match else f' r="{number}"'
+        inner = (match.group(2) or "") if match else ""
+        inner = splice_sorted(
+            inner, CELL_PATTERN, lambda m: element_number(m, column=True), row_cells,
+            lambda column, m: cell_xml(number, column, row_cells[column], m.group(1) if m else "")
+        )
+        return f"<row{attrs}>{inner}</row>"
+
+    body = splice_sorted(sheet_data.group(1) or "", ROW_PATTERN, element_number, by_row, render_row)
+    return f"{xml[:sheet_data.start()]}<sheetData>{body}</sheetData>{xml[sheet_data.end():]}"
+
+
+def patch_workbook(content, changes):
+    """
+    Bytes of the uploaded workbook `content` with `changes` ({sheet: {(row, column):
+    value}}) written into their cells. Raises ValueError for a package whose sheets
+    cannot be located or patched; callers fall back to re-serializing it.
+    """
+    with zipfile.ZipFile(BytesIO(content)) as package:
+        parts = sheet_parts(package)
+        patched = {}
+        for sheet, cells in changes.items():
+            if not cells:
+                continue
+            if sheet not in parts:
+                raise ValueError(f"Faqja '{sheet}' nuk gjendet në workbook")
+            xml = package.read(parts[sheet]).decode("utf-8")
+            patched[parts[sheet]] = patch_sheet_xml(xml, cells).encode("utf-8")
+        if not patched:
+            return content
+
+        output = BytesIO()
+        with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as target:
+            for info in package.infolist():
+                target.writestr(info, patched.get(info.filename) or package.read(info.filename))
+    return output.getvalue()
@@ -0,0 +1,887 @@
+"""
+Kobo XLSForm generation from tagged Word questionnaires.
+
+A questionnaire line carries its type in brackets, e.g. `1. Gjinia? [single]`,
+`[matrix single 5]`, `[ranking 3]`, `[scale 1(Aspak)-5(Plotësisht)]`. Lines are
+lexed once into a token stream and emitted as survey/choices/settings rows.
+
+A `[cascade D3]` tag on a single/multiple question filters its options by the
+answer to question D3; each option line then names its parent option after a
+pipe, e.g. `Fshati A | Prishtinë`.
+
+Lines between `[repeat N] Label` and `[end repeat]` are emitted once inside a
+repeat group, N being a fixed count or the number of the question holding it.
+
+A `[fragment demografia]` line splices a standard block from the question bank.
+"""
+import csv
+import os
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from io import BytesIO, StringIO
+from kobo_automation.validate import validate_xlsform, format_problem
+from kobo_automation.cost import estimate_form_cost, cost_report_csv
+from kobo_automation.question_bank import compile_fragment
+
+
+TAG_PATTERN = re.compile(r'\[(.*?)\]', re.IGNORECASE)
+STRIP_TAGS_PATTERN = re.compile(r'\s*\[.*?\]\s*')
+MATRIX_TAG_PATTERN = re.compile(r"matrix\s+(single|multiple)\s+(\d+)")
+RANKING_TAG_PATTERN = re.compile(r"ranking\s+(\d+)")
+SCALE_TAG_PATTERN = re.compile(r"scale\s*(\d+)(?:\((.*?)\))?\s*-\s*(\d+)(?:\((.*?)\))?")
+QUESTION_NUMBER_PATTERN = re.compile(r'^([A-Z]+\d+[a-zA-Z\.]*|\d+)[\.\)]?\s*(.+)')
+GENERIC_TYPES = {"single", "multiple", "text", "string", "numeric", "note", "other"}
+CASCADE_TAG_PATTERN = re.compile(r"cascade\s+(\S+)", re.IGNORECASE)
+REPEAT_BEGIN_PATTERN = re.compile(r"^\[repeat\s+([^\]]+?)\s*\]\s*(.*)$", re.IGNORECASE)
+REPEAT_END_PATTERN = re.compile(r"^\[end[\s_]*repeat\]", re.IGNORECASE)
+FRAGMENT_PATTERN = re.compile(r"^\[fragment\s+([\w-]+)(?:\s+v?(\d+))?\s*\]", re.IGNORECASE)
+
+# Lists at least this long are shipped as CSV media files in external-lists mode
+EXTERNAL_LIST_MIN_OPTIONS = 30
+
+# [ranking N] output: one select_one per rank filtered through a running list of
+# the ranks already chosen ("compact"), or ODK's drag-and-drop rank widget ("native")
+RANKING_MODES = ("compact", "native")
+
+def sanitize_name(label):
+    return re.sub(r'\W+', '_', label.lower().strip())[:30]
+
+def extract_tags(text):
+    """Extract all bracketed tags like [random], [hint: ...], [single], [scale ...] etc."""
+    if "[" not in text:
+        return []
+    return TAG_PATTERN.findall(text)
+
+def parse_question_tags(tags):
+    """Classify tags into type, parameters, and hint."""
+    q_type = None
+    matrix_count = None
+    hint = None
+    parameters = None
+
+    for raw_tag in tags:
+        tag = raw_tag.strip().lower()
+
+        # Randomization
+        if tag == "random":
+            parameters = "randomize=true"
+
+        # Hint tag
+        elif tag.startswith("hint:"):
+            hint = raw_tag.split(":", 1)[1].strip()
+
+        # Matrix type
+        elif tag.startswith("matrix"):
+            m = MATRIX_TAG_PATTERN.match(tag)
+            if m:
+                q_type = f"matrix {m.group(1)}"
+                matrix_count = int(m.group(2))
+
+        # Ranking type
+        elif tag.startswith("ranking"):
+            m = RANKING_TAG_PATTERN.match(tag)
+            if m:
+                q_type = f"ranking {m.group(1)}"
+                matrix_count = int(m.group(1))
+
+        # Scale type
+        elif tag.startswith("scale"):
+            m = SCALE_TAG_PATTERN.match(tag)
+            if m:
+                start, min_label, end, max_label = m.groups()
+                q_type = f"scale {start}-{end}"
+                matrix_count = {
+                    "start": int(start),
+                    "end": int(end),
+                    "min_label": min_label,
+                    "max_label": max_label
+                }
+
+        # Generic question types
+        elif tag in GENERIC_TYPES:
+            q_type = tag
+
+    return q_type, matrix_count, parameters, hint
+
+def parse_cascade_tag(tags):
+    """The question number named by a [cascade QNUM] tag, or None."""
+    for raw_tag in tags:
+        m = CASCADE_TAG_PATTERN.fullmatch(raw_tag.strip())
+        if m:
+            return m.group(1).rstrip('.')
+    return None
+
+def strip_type(text):
+    if "[" not in text:
+        return text.strip()
+    return STRIP_TAGS_PATTERN.sub('', text).strip()
+
+def extract_question_number_and_text(line):
+    match = QUESTION_NUMBER_PATTERN.match(line.strip())
+    if match:
+        number = match.group(1)
+        text = match.group(2)
+        text = re.sub(r'[\|_]+', '', text).strip()
+        text = re.sub(r'\s{2,}', ' ', text).strip()
+        return number, text
+    return None, line
+
+def clean_label_prefix(text):
+    text = re.sub(r'^[\(\[]?[a-zA-Z0-9]+[\.\)\]]\s*', '', text)
+    text = re.sub(r'[?:]+', '', text)
+    text = re.sub(r'[_\s]{2,}', '', text)
+    return text.strip()
+
+def has_random_tag(text):
+    return "[random]" in text.lower()
+
+def read_docx_lines(source):
+    """Return the non-empty, stripped text lines of a .docx path or file-like object."""
+    from docx2python import docx2python
+
+    doc = docx2python(source)
+    return [line.strip() for line in doc.text.split('\n') if line.strip()]
+
+def tokenize_lines(lines):
+    """
+    Classify every line exactly once into a typed token stream.
+
+    Token kinds:
+      - "question": a line with a type tag; carries q_type, matrix_count,
+        parameters, hint, cascade, full_line, qnum and label_text
+      - "note": a [note] line; carries label
+      - "repeat_begin": a [repeat N] line; carries count and label
+      - "repeat_end": an [end repeat] line
+      - "fragment": a [fragment NAME VERSION] line; carries name and version (or None)
+      - "option": an answer line under a single/multiple/ranking question
+      - "matrix_column": one of the N column lines following [matrix ... N]
+      - "matrix_row": a row line under a matrix question
+      - "text": any other line (ignored by the generator)
+    """
+    tokens = []
+    context = None
+    columns_left = 0
+
+    for line in lines:
+        # Matrix columns are taken verbatim, whatever they contain
+        if columns_left:
+            tokens.append({"kind": "matrix_column", "line": line})
+            columns_left -= 1
+            continue
+
+        fragment = FRAGMENT_PATTERN.match(line)
+        if fragment:
+            name, version = fragment.groups()
+            tokens.append({"kind": "fragment", "line": line, "name": name, "version": int(version) if version else None})
+            context = None
+            continue
+
+        repeat_begin = REPEAT_BEGIN_PATTERN.match(line)
+        if repeat_begin or REPEAT_END_PATTERN.match(line):
+            if repeat_begin:
+                count, label = repeat_begin.groups()
+                tokens.append({"kind": "repeat_begin", "line": line, "count": count.rstrip('.'), "label": label.strip()})
+            else:
+                tokens.append({"kind": "repeat_end", "line": line})
+            context = None
+            continue
+
+        tags = extract_tags(line)
+        q_type, matrix_count, parameters, hint = parse_question_tags(tags)
+
+        if line.lower().startswith("[note]") or q_type == "note":
+            label = line[6:].strip() if line.lower().startswith("[note]") else strip_type(line)
+            tokens.append({"kind": "note", "line": line, "label": label})
+            context = None
+            continue
+
+        if q_type:
+            full_line = strip_type(line)
+            qnum, label_text = extract_question_number_and_text(full_line)
+            tokens.append({
+                "kind": "question",
+                "line": line,
+                "q_type": q_type,
+                "matrix_count": matrix_count,
+                "parameters": parameters,
+                "hint": hint,
+                "cascade": parse_cascade_tag(tags),
+                "full_line": full_line,
+                "qnum": qnum,
+                "label_text": label_text
+            })
+            context = q_type
+            if q_type.startswith("matrix"):
+                columns_left = matrix_count
+            continue
+
+        if context in ("single", "multiple") or (context and context.startswith("ranking")):
+            kind = "option"
+        elif context and context.startswith("matrix"):
+            kind = "matrix_row"
+        else:
+            kind = "text"
+        tokens.append({"kind": kind, "line": line})
+
+    return tokens
+
+def question_labels(tokens):
+    """Labels of all question tokens, as shown in the 'skip questions' multiselect."""
+    return [t["label_text"] for t in tokens if t["kind"] == "question" and t["label_text"]]
+
+def generate_qname(qnum, q_index, coding_mode):
+    """
+    Returns (qname, updated_q_index)
+    """
+
+    # Case 1: No number in Word → always P1, P2…
+    if not qnum:
+        return f"P{q_index}", q_index + 1
+
+    qnum_clean = qnum.rstrip('.')
+
+    # Case 2: D-questions → ALWAYS preserved
+    if qnum_clean.upper().startswith("D"):
+        return qnum_clean, q_index
+
+    # Case 3: User wants original numbering
+    if coding_mode == "Ruaj numërimin origjinal si në Word (A1, B2a, C1, …)":
+        return qnum_clean, q_index
+
+    # Case 4: User wants Q1, Q2…
+    if coding_mode == "Q1, Q2, Q3, ...":
+        return f"Q{q_index}", q_index + 1
+
+    # Case 5: Default → P1, P2…
+    return f"P{q_index}", q_index + 1
+  
+def new_choice_registry(choices):
+    """
+    Index of the choice lists emitted into `choices` (and of the lists shipped as
+    CSV files in `files`), by option content and by name.
+    """
+    return {
+        "choices": choices,
+        "files": {},
+        "by_content": {},
+        "by_file_content": {},
+        "names": {c["list_name"] for c in choices}
+    }
+
+def choice_row(option):
+    """Choice row fields of a (name, label) or (name, label, extra_columns) option."""
+    name, label, *extra = option
+    row = {"name": name, "label": label}
+    if extra:
+        row.update(extra[0])
+    return row
+
+def unique_list_name(registry, list_name):
+    unique_name = list_name
+    suffix = 2
+    while unique_name in registry["names"]:
+        unique_name = f"{list_name}_{suffix}"
+        suffix += 1
+    registry["names"].add(unique_name)
+    return unique_name
+
+def register_choice_list(registry, list_name, options):
+    """
+    Emit a choice list once per distinct option set.
+    `options` is a sequence of (name, label) pairs, or (name, label, extra_columns)
+    where extra_columns are (column, value) pairs such as a cascade parent.
+    Returns the list_name to reference: that of an identical list emitted earlier,
+    otherwise `list_name` (suffixed _2, _3, … if the name is already taken by
+    different options).
+    """
+    key = tuple(options)
+    existing = registry["by_content"].get(key)
+    if existing:
+        return existing
+
+    unique_name = unique_list_name(registry, list_name)
+    registry["by_content"][key] = unique_name
+    registry["choices"].extend(
+        {"list_name": unique_name, **choice_row(option)} for option in options
+    )
+    return unique_name
+
+def register_external_list(registry, list_name, options):
+    """
+    Like register_choice_list, but the options go to a `<list_name>.csv` media file
+    for select_one_from_file / select_multiple_from_file. Returns the file name.
+    """
+    key = tuple(options)
+    existing = registry["by_file_content"].get(key)
+    if existing:
+        return existing
+
+    filename = f"{unique_list_name(registry, list_name)}.csv"
+    registry["by_file_content"][key] = filename
+    registry["files"][filename] = [choice_row(option) for option in options]
+    return filename
+
+SURVEY_COLUMNS = ["type", "name", "label", "hint", "required", "appearance", "relevant", "choice_filter", "parameters"]
+CHOICES_COLUMNS = ["list_name", "name", "label"]
+SETTINGS_COLUMNS = ["style"]
+EXTERNAL_CHOICES_COLUMNS = ["name", "label"]
+
+def sheet_columns(rows, schema):
+    """The fixed schema columns, followed by any other keys the rows use in first-seen order."""
+    columns = list(schema)
+    known = set(columns)
+    for row in rows:
+        for key in row:
+            if key not in known:
+                known.add(key)
+                columns.append(key)
+    return columns
+
+def write_xlsform(output_xlsx, survey, choices, settings):
+    """
+    Stream survey/choices/settings rows into a write-only openpyxl workbook.
+    `output_xlsx` is a path or a file-like object such as BytesIO.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheets = [("survey", survey, SURVEY_COLUMNS), ("choices", choices, CHOICES_COLUMNS), ("settings", settings, SETTINGS_COLUMNS)]
+    for title, rows, schema in sheets:
+        if title == "choices" and not rows:
+            continue
+        sheet = workbook.create_sheet(title)
+        columns = sheet_columns(rows, schema)
+        sheet.append(columns)
+        for row in rows:
+            sheet.append([row.get(column) for column in columns])
+    workbook.save(output_xlsx)
+
+def write_choices_csv(rows):
+    """UTF-8 bytes of an external choices file (name, label and any filter columns)."""
+    output = StringIO()
+    writer = csv.writer(output)
+    columns = sheet_columns(rows, EXTERNAL_CHOICES_COLUMNS)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow([row.get(column, "") for column in columns])
+    return output.getvalue().encode("utf-8")
+
+def form_files(xlsx_name, form):
+    """
+    {file name: bytes} for a built form: the XLSForm plus, in external-lists mode,
+    its CSV media files, which must be uploaded to Kobo next to the form.
+    """
+    output = BytesIO()
+    write_xlsform(output, form["survey"], form["choices"], form["settings"])
+    files = {xlsx_name: output.getvalue()}
+    for filename, rows in form["attachments"].items():
+        files[filename] = write_choices_csv(rows)
+    return files
+
+def zip_files(files):
+    output = BytesIO()
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as archive:
+        for filename, content in files.items():
+            archive.writestr(filename, content)
+    return output.getvalue()
+
+def build_xlsform(tokens, coding_mode, data_method=True, selected_questions=None, anketuesit_choices=(), external_lists=False, ranking_mode="compact"):
+    """
+    Emit the XLSForm rows for a token stream.
+    `anketuesit_choices` are the enumerator roster rows for anketuesit_list.
+    With `external_lists`, the roster and every single/multiple list of at least
+    EXTERNAL_LIST_MIN_OPTIONS options are emitted as *_from_file questions instead
+    of being inlined in the choices sheet. `ranking_mode` is one of RANKING_MODES.
+    Returns a dict with the survey, choices and settings rows, the CSV attachments
+    ({file name: rows}) and the labels of the [other] questions that were skipped.
+    """
+    ranking_labels = [
+        "Zgjedhja e parë", "Zgjedhja e dytë", "Zgjedhja e tretë",
+        "Zgjedhja e katërt", "Zgjedhja e pestë", "Zgjedhja e gjashtë",
+        "Zgjedhja e shtatë", "Zgjedhja e tetë", "Zgjedhja e nëntë",
+        "Zgjedhja e dhjetë", "Zgjedhja e njëmbëdhjetë", "Zgjedhja e dymbëdhjetë",
+        "Zgjedhja e trembëdhjetë", "Zgjedhja e katërmbëdhjetë", "Zgjedhja e pesëmbëdhjetë",
+        "Zgjedhja e gjashtëmbëdhjetë", "Zgjedhja e shtatëmëdhjetë", "Zgjedhja e tetëmbëdhjetë",
+        "Zgjedhja e nëntëmbëdhjetë", "Zgjedhja e njëzet", "Ekstra"
+    ]
+
+    survey = []
+    choices = []
+    skipped_other_questions = []
+    settings = [{'style': 'theme-grid no-text-transform'}]
+
+    survey.append({
+       "type": "start",
+        "name": "start"
+    })
+    
+    survey.append({
+       "type": "end",
+        "name": "end"
+    })
+    
+    if data_method:
+        survey.append({
+            "type": "geopoint",
+            "name": "GPS",
+            "label": "GPS",
+            "required": "true"
+    })
+           
+    # Identical option sets share one list
+    registry = new_choice_registry(choices)
+
+    if external_lists and anketuesit_choices:
+        anketuesit_file = register_external_list(
+            registry, "anketuesit_list", [(c["name"], c["label"]) for c in anketuesit_choices]
+        )
+        anketuesit_type = f"select_one_from_file {anketuesit_file}"
+    else:
+        # Add the dynamic choices
+        choices.extend(anketuesit_choices)
+        registry["names"].add("anketuesit_list")
+        anketuesit_type = "select_one anketuesit_list"
+
+    # Add Anketuesi_ja question
+    survey.append({
+       "type": anketuesit_type,
+        "name": "Anketuesi_ja",
+        "label": "Anketuesi/ja",
+        "required": "true",
+        "appearance": "search"
+    })
+
+    # qnum/qname (lowercase) → (qname, q_type, {option label: name}) for [cascade] parents
+    select_questions = {}
+    # qnum/qname (lowercase) → qname of every emitted question, for [repeat QNUM] counts
+    question_names = {}
+    # Names of the repeats still open
+    open_repeats = []
+        
+    i = 0
+    q_index = 1
+    note_index = 1
+    repeat_index = 1
+
+    def add_common_question(fields, parameters, hint):
+        if parameters:
+            fields["parameters"] = parameters
+        if hint:
+            fields["hint"] = hint
+        survey.append(fields)
+
+    def collect_body(start_index, kind):
+        body = []
+        while start_index < len(tokens) and tokens[start_index]["kind"] == kind:
+            body.append(tokens[start_index]["line"])
+            start_index += 1
+        return body, start_index
+
+    while i < len(tokens):
+        token = tokens[i]
+
+        if token["kind"] == "note":
+            survey.append({
+                "type": "note",
+                "name": f"note{note_index}",
+                "label": token["label"]
+            })
+            note_index += 1
+            i += 1
+            continue
+
+        if token["kind"] == "fragment":
+            fragment = compile_fragment(token["name"], token["version"])
+            list_names = {
+                list_name: register_choice_list(registry, list_name, options)
+                for list_name, options in fragment["lists"].items()
+            }
+            for row in fragment["survey"]:
+                row = dict(row)
+                q_type, _, list_name = row["type"].partition(" ")
+                if list_name:
+                    row["type"] = f"{q_type} {list_names[list_name]}"
+                survey.append(row)
+                question_names[row["name"].lower()] = row["name"]
+            i += 1
+            continue
+
+        if token["kind"] == "repeat_begin":
+            count = token["count"]
+            if count.isdigit():
+                repeat_count = count
+            elif count.lower() in question_names:
+                repeat_count = f"${{{question_names[count.lower()]}}}"
+            else:
+                raise ValueError(f"Formatimi i Word dokumentit nuk është valid në këtë linjë: '{token['line']}' (pyetja '{count}' nuk u gjet para [repeat])")
+
+            repeat_name = f"repeat{repeat_index}"
+            repeat_index += 1
+            open_repeats.append(repeat_name)
+            survey.append({
+                "type": "begin_repeat",
+                "name": repeat_name,
+                "label": token["label"] or f"Përsëritja ${{{repeat_name}_nr}}",
+                "repeat_count": repeat_count
+            })
+            # Instance number of the current repeat, 1-based
+            survey.append({"type": "calculate", "name": f"{repeat_name}_nr", "calculation": "position(..)"})
+            i += 1
+            continue
+
+        if token["kind"] == "repeat_end":
+            if not open_repeats:
+                raise ValueError(f"Formatimi i Word dokumentit nuk është valid në këtë linjë: '{token['line']}' ([end repeat] pa [repeat])")
+            survey.append({"type": "end_repeat", "name": f"{open_repeats.pop()}_end"})
+            i += 1
+            continue
+
+        # Options, matrix rows/columns and stray text are consumed by their question
+        if token["kind"] != "question":
+            i += 1
+            continue
+
+        q_type = token["q_type"]
+        matrix_count = token["matrix_count"]
+        parameters = token["parameters"]
+        hint = token["hint"]
+        cascade = token.get("cascade")
+        full_line = token["full_line"]
+        qnum = token["qnum"]
+        label_text = token["label_text"]
+        i += 1
+
+        # Skip if q_type is "other"
+        if q_type == "other":
+            # Collect label for display
+            if label_text:
+                skipped_other_questions.append(label_text)
+            continue
+
+        if selected_questions is not None and label_text in selected_questions:
+            continue
+
+        if qnum:
+            qnum = re.sub(r'\.\.+', '.', qnum).rstrip('.')
+
+        label = f"{qnum}. {label_text}" if qnum else full_line
+
+        qname, q_index = generate_qname(qnum, q_index, coding_mode)
+
+        qname = qname.rstrip('.')
+        required = "yes"
+
+        for key in (qnum, qname):
+            if key:
+                question_names[key.lower()] = qname
+
+        if q_type in ["single", "multiple"]:
+            options, i = collect_body(i, "option")
+            parent = None
+            if cascade:
+                parent = select_questions.get(cascade.lower())
+                if parent is None:
+                    raise ValueError(f"Pyetja '{label}' i referohet me [cascade] pyetjes '{cascade}', që nuk është pyetje single/multiple para saj")
+
+            option_choices = []
+            for idx, opt in enumerate(options, 1):
+                name_value = f"_{idx}" if q_type == "multiple" else str(idx)
+                if parent is None:
+                    option_choices.append((name_value, clean_label_prefix(opt)))
+                    continue
+                # "Fshati A | Prishtinë": the option and its parent option
+                child_label, _, parent_label = opt.rpartition("|")
+                parent_qname, _, parent_names = parent
+                parent_name = parent_names.get(clean_label_prefix(parent_label).lower())
+                if not child_label or parent_name is None:
+                    raise ValueError(f"Formatimi i Word dokumentit nuk është valid në këtë linjë: '{opt}' (opsioni prind nuk u gjet te pyetja {cascade})")
+                option_choices.append((name_value, clean_label_prefix(child_label), ((parent_qname, parent_name),)))
+
+            qstyle = "select_one" if q_type == "single" else "select_multiple"
+            if external_lists and len(option_choices) >= EXTERNAL_LIST_MIN_OPTIONS:
+                list_file = register_external_list(registry, qname + "_list", option_choices)
+                question_type = f"{qstyle}_from_file {list_file}"
+            else:
+                list_name = register_choice_list(registry, qname + "_list", option_choices)
+                question_type = f"{qstyle} {list_name}"
+
+            question = {
+                "type": question_type,
+                "name": qname,
+                "label": label,
+                "required": required
+            }
+            if parent is not None:
+                parent_qname, parent_type, _ = parent
+                question["choice_filter"] = (
+                    f"selected(${{{parent_qname}}}, {parent_qname})" if parent_type == "multiple"
+                    else f"{parent_qname} = ${{{parent_qname}}}"
+                )
+            add_common_question(question, parameters, hint)
+
+            option_names = {option[1].lower(): option[0] for option in option_choices}
+            for key in (qnum, qname):
+                if key:
+                    select_questions[key.lower()] = (qname, q_type, option_names)
+
+            for idx, (opt, (name_value, clean, *_)) in enumerate(zip(options, option_choices), 1):
+                if '_' in opt:
+                    open_name = f"{qname}_{idx}"
+                    relevant_expr = f"selected(${{{qname}}}, '{name_value}')" if q_type == "multiple" else f"${{{qname}}} = '{name_value}'"
+                    survey.append({
+                        "type": "text",
+                        "name": open_name,
+                        "label": f"{clean}",
+                        "relevant": relevant_expr,
+                        "required": "yes"
+                    })
+
+        elif q_type == "numeric":
+            add_common_question({
+                "type": "integer",
+                "name": qname,
+                "label": label,
+                "required": required
+            }, parameters, hint)
+
+        elif q_type in ["text", "string"]:
+            add_common_question({
+                "type": "text",
+                "name": qname,
+                "label": label,
+                "required": required
+            }, parameters, hint)
+
+        elif q_type.startswith("scale") and isinstance(matrix_count, dict):
+            start = matrix_count["start"]
+            end = matrix_count["end"]
+            min_label = matrix_count.get("min_label")
+            max_label = matrix_count.get("max_label")
+
+            scale_choices = []
+            for j in range(start, end + 1):
+                lbl = f"{j} - {min_label}" if j == start and min_label else \
+                      f"{j} - {max_label}" if j == end and max_label else str(j)
+                scale_choices.append((str(j), lbl))
+            list_name = register_choice_list(registry, f"scale_{start}_{end}", scale_choices)
+
+            question = {
+                "type": f"select_one {list_name}",
+                "name": qname,
+                "label": label,
+                "required": required,
+                "appearance": "likert"
+            }
+            add_common_question(question, parameters, hint)
+
+        elif q_type.startswith("matrix"):
+            style = "select_one" if "single" in q_type else "select_multiple"
+            columns, i = collect_body(i, "matrix_column")
+            rows, i = collect_body(i, "matrix_row")
+            list_name = register_choice_list(
+                registry, qname + "_matrix", [(str(j), col) for j, col in enumerate(columns, 1)]
+            )
+
+            survey.append({"type": "begin_group", "name": f"{qname}_group", "appearance": "field-list", "required": "no"})
+            survey.append({"type": f"{style} {list_name}", "name": f"{qname}_matrix_label", "label": label, "appearance": "label", "required": "no"})
+
+            for idx, row in enumerate(rows, 1):
+                field = {
+                    "type": f"{style} {list_name}",
+                    "name": f"{qname}_{idx}",
+                    "label": row,
+                    "appearance": "list-nolabel",
+                    "required": "yes"
+                }
+                if parameters:
+                    field["parameters"] = parameters
+                survey.append(field)
+
+            survey.append({"type": "end_group", "name": f"{qname}_group_end"})
+
+        elif q_type.startswith("ranking"):
+            rank_count = matrix_count
+            options, i = collect_body(i, "option")
+            list_name = register_choice_list(
+                registry, qname + "_list",
+                [(str(idx), clean_label_prefix(opt)) for idx, opt in enumerate(options, 1)]
+            )
+
+            if ranking_mode == "native":
+                # The widget orders every option; N is shown as a hint
+                add_common_question({
+                    "type": f"rank {list_name}",
+                    "name": qname,
+                    "label": label,
+                    "hint": hint or f"Rendit {rank_count} opsionet e para",
+                    "required": required
+                }, parameters, None)
+                continue
+
+            survey.append({"type": "begin_group", "name": f"{qname}_group", "appearance": "field-list"})
+            survey.append({"type": "note", "name": f"{qname}_label", "label": label})
+
+            # `{qname}_zgjedhur_{idx}` holds the options picked up to rank idx as a
+            # space-separated list, so each rank filters on one field instead of all
+            # previous ranks
+            for idx in range(1, rank_count + 1):
+                rank_name = f"{qname}_{idx}"
+                field = {
+                    "type": f"select_one {list_name}",
+                    "name": rank_name,
+                    "label": ranking_labels[idx - 1] if idx <= 20 else ranking_labels[-1],
+                    "required": "yes",
+                    "appearance": "minimal"
+                }
+                if idx > 1:
+                    field["choice_filter"] = f"not(selected(${{{qname}_zgjedhur_{idx - 1}}}, name))"
+                survey.append(field)
+
+                if idx < rank_count:
+                    picked = f"${{{rank_name}}}" if idx == 1 else f"concat(${{{qname}_zgjedhur_{idx - 1}}}, ' ', ${{{rank_name}}})"
+                    survey.append({"type": "calculate", "name": f"{qname}_zgjedhur_{idx}", "calculation": picked})
+
+            survey.append({"type": "end_group", "name": f"{qname}_group_end"})
+
+        else:
+            raise ValueError(f"Formatimi i Word dokumentit nuk është valid në këtë linjë: '{token['line']}'")
+
+    if open_repeats:
+        raise ValueError(f"Formatimi i Word dokumentit nuk është valid: [repeat] pa [end repeat] ({', '.join(open_repeats)})")
+
+    survey.append({"type": "text", "name": "emri_mbiemri", "label": "Emri dhe mbiemri:", "required": "yes"})
+    survey.append({"type": "text", "name": "numri_telefonit", "label": "Numri i telefonit:", "required": "yes"})
+
+    return {
+        "survey": survey,
+        "choices": choices,
+        "settings": settings,
+        "attachments": registry["files"],
+        "skipped_other_questions": skipped_other_questions
+    }
+
+def generate_xlsform(input_docx, output_xlsx, coding_mode, data_method=True, selected_questions=None, tokens=None, anketuesit_choices=(), ranking_mode="compact"):
+    """
+    Write the XLSForm for a questionnaire to `output_xlsx` (path or file-like).
+    Returns the labels of the [other] questions that were skipped.
+    """
+    # Reuse an already parsed token stream when the caller has one
+    if tokens is None:
+        tokens = tokenize_lines(read_docx_lines(input_docx))
+
+    form = build_xlsform(tokens, coding_mode, data_method, selected_questions, anketuesit_choices, ranking_mode=ranking_mode)
+    write_xlsform(output_xlsx, form["survey"], form["choices"], form["settings"])
+    return form["skipped_other_questions"]
+
+
+BULK_REPORT_NAME = "raporti_i_gjenerimit.csv"
+COST_REPORT_SUFFIX = "_kosto.csv"
+
+def iter_questionnaires(source):
+    """
+    Yield (filename, content) for every .docx in a zip (path, bytes or file-like)
+    or in a folder path. Word lock files (~$...) and macOS metadata are ignored.
+    """
+    if isinstance(source, (str, os.PathLike)) and os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            if name.lower().endswith(".docx") and not name.startswith("~$"):
+                with open(os.path.join(source, name), "rb") as f:
+                    yield name, f.read()
+        return
+
+    if isinstance(source, bytes):
+        source = BytesIO(source)
+    with zipfile.ZipFile(source) as archive:
+        for info in archive.infolist():
+            name = os.path.basename(info.filename)
+            if info.is_dir() or info.filename.startswith("__MACOSX/"):
+                continue
+            if name.lower().endswith(".docx") and not name.startswith("~$"):
+                yield name, archive.read(info)
+
+def generate_xlsform_bytes(filename, content, coding_mode, data_method, anketuesit_choices, external_lists=False, ranking_mode="compact"):
+    """
+    Lint, generate, validate and cost one form in a worker process.
+    Returns (filename, generated_name, files, skipped, problems, cost, error) where
+    `files` is the form_files dict, `problems` the Word formatting problems (sheet
+    "word") followed by the validation ones, and `cost` the estimate_form_cost entries.
+    Failures are reported in `error` instead of raised so one bad document does not
+    stop a batch.
+    """
+    # The linter builds on this module, hence the late import
+    from kobo_automation.lint import lint_questionnaire
+
+    generated_name = f"{os.path.splitext(filename)[0]}_gjeneruar.xlsx"
+    lint_problems = []
+    try:
+        lines = read_docx_lines(BytesIO(content))
+        tokens = tokenize_lines(lines)
+        lint_problems = [
+            ("word", line_number, f"{message} ('{line[:60]}')")
+            for line_number, line, message in lint_questionnaire(lines, tokens)
+        ]
+        form = build_xlsform(tokens, coding_mode, data_method, anketuesit_choices=anketuesit_choices, external_lists=external_lists, ranking_mode=ranking_mode)
+        problems = lint_problems + validate_xlsform(form["survey"], form["choices"], form["attachments"])
+        cost = estimate_form_cost(form["survey"], form["choices"])
+        return filename, generated_name, form_files(generated_name, form), form["skipped_other_questions"], problems, cost, None
+    except Exception as e:
+        # The cause first, then every formatting problem of the document
+        error = "; ".join([str(e), *map(format_problem, lint_problems)])
+        return filename, generated_name, None, [], [], [], error
+
+def generate_xlsform_bulk(questionnaires, coding_mode, data_method=True, anketuesit_choices=(), max_workers=None, on_progress=None, external_lists=False, ranking_mode="compact"):
+    """
+    Generate forms for many questionnaires across CPU cores.
+    `questionnaires` is an iterable of (filename, content); the roster is fetched once
+    by the caller and shipped to every worker. `on_progress(done, total)` is called as
+    results come in. Returns (zip_bytes, results) where the zip holds every generated
+    form (CSV media files in a `<form>_media/` folder and its cost report in
+    `<form>_kosto.csv` next to it) plus a CSV report, and results are the generate_xlsform_bytes tuples in input order.
+    """
+    questionnaires = list(questionnaires)
+    anketuesit_choices = list(anketuesit_choices)
+    results = [None] * len(questionnaires)
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(generate_xlsform_bytes, filename, content, coding_mode, data_method, anketuesit_choices, external_lists, ranking_mode): idx
+            for idx, (filename, content) in enumerate(questionnaires)
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            results[futures[future]] = future.result()
+            if on_progress:
+                on_progress(done, len(questionnaires))
+
+    report = StringIO()
+    writer = csv.writer(report)
+    writer.writerow(["dokumenti", "formulari", "statusi", "gabimi", "pyetjet_other_te_anashkaluara", "problemet_e_validimit", "pesha_maksimale"])
+
+    output = BytesIO()
+    used_names = set()
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as archive:
+        for filename, generated_name, files, skipped, problems, cost, error in results:
+            if error:
+                writer.writerow([filename, "", "gabim", error, "", "", ""])
+                continue
+            xlsx_bytes = files.pop(generated_name)
+            # Same file name in different zip folders
+            base, ext = os.path.splitext(generated_name)
+            suffix = 2
+            while generated_name in used_names:
+                generated_name = f"{base}_{suffix}{ext}"
+                suffix += 1
+            used_names.add(generated_name)
+            archive.writestr(generated_name, xlsx_bytes)
+            media_folder = f"{os.path.splitext(generated_name)[0]}_media"
+            for media_name, media_bytes in files.items():
+                archive.writestr(f"{media_folder}/{media_name}", media_bytes)
+            archive.writestr(f"{os.path.splitext(generated_name)[0]}{COST_REPORT_SUFFIX}", cost_report_csv(cost))
+            writer.writerow([
+                filename, generated_name, "probleme" if problems else "ok", "",
+                "; ".join(skipped), "; ".join(format_problem(p) for p in problems),
+                cost[0]["score"] if cost else 0
+            ])
+        archive.writestr(BULK_REPORT_NAME, report.getvalue())
+
+    return output.getvalue(), results
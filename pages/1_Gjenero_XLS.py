@@ -1,12 +1,21 @@
 import streamlit as st
-from docx2python import docx2python
-import pandas as pd
-import re
+import hashlib
 import tempfile
 import os
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from google.oauth2.service_account import Credentials
 import gspread
 from io import BytesIO
+from kobo_automation.xlsform import (
+    read_docx_lines, tokenize_lines, question_labels, build_xlsform, form_files, zip_files,
+    iter_questionnaires, generate_xlsform_bulk, EXTERNAL_LIST_MIN_OPTIONS
+)
+from kobo_automation.validate import validate_xlsform, format_problem
+from kobo_automation.cost import estimate_form_cost, format_cost_entry, cost_report_csv
+from kobo_automation.lint import lint_questionnaire, lint_warnings, format_lint_problem
 
 
 st.set_page_config(page_title="Gjenero XLS", layout="centered")
@@ -26,90 +35,57 @@ st.markdown("Ngarko dokumentin `.docx` dhe gjenero formularin XLS për përdorim
 
 uploaded_file = st.file_uploader("Zgjidh një dokument `.docx` të formatuar:", type=["docx"])
 
-def sanitize_name(label):
-    return re.sub(r'\W+', '_', label.lower().strip())[:30]
-
-def extract_tags(text):
-    """Extract all bracketed tags like [random], [hint: ...], [single], [scale ...] etc."""
-    return re.findall(r'\[(.*?)\]', text, flags=re.IGNORECASE)
-
-def parse_question_tags(tags):
-    """Classify tags into type, parameters, and hint."""
-    q_type = None
-    matrix_count = None
-    hint = None
-    parameters = None
-
-    for raw_tag in tags:
-        tag = raw_tag.strip().lower()
-
-        # Randomization
-        if tag == "random":
-            parameters = "randomize=true"
-
-        # Hint tag
-        elif tag.startswith("hint:"):
-            hint = raw_tag.split(":", 1)[1].strip()
-
-        # Matrix type
-        elif tag.startswith("matrix"):
-            m = re.match(r"matrix\s+(single|multiple)\s+(\d+)", tag)
-            if m:
-                q_type = f"matrix {m.group(1)}"
-                matrix_count = int(m.group(2))
-
-        # Ranking type
-        elif tag.startswith("ranking"):
-            m = re.match(r"ranking\s+(\d+)", tag)
-            if m:
-                q_type = f"ranking {m.group(1)}"
-                matrix_count = int(m.group(1))
-
-        # Scale type
-        elif tag.startswith("scale"):
-            m = re.match(r"scale\s*(\d+)(?:\((.*?)\))?\s*-\s*(\d+)(?:\((.*?)\))?", tag)
-            if m:
-                start, min_label, end, max_label = m.groups()
-                q_type = f"scale {start}-{end}"
-                matrix_count = {
-                    "start": int(start),
-                    "end": int(end),
-                    "min_label": min_label,
-                    "max_label": max_label
-                }
-
-        # Generic question types
-        elif tag in ["single", "multiple", "text", "string", "numeric", "note", "other"]:
-            q_type = tag
-
-    return q_type, matrix_count, parameters, hint
-
-def strip_type(text):
-    return re.sub(r'\s*\[.*?\]\s*', '', text).strip()
-
-def extract_question_number_and_text(line):
-    match = re.match(r'^([A-Z]+\d+[a-zA-Z\.]*|\d+)[\.\)]?\s*(.+)', line.strip())
-    if match:
-        number = match.group(1)
-        text = match.group(2)
-        text = re.sub(r'[\|_]+', '', text).strip()
-        text = re.sub(r'\s{2,}', ' ', text).strip()
-        return number, text
-    return None, line
-
-def clean_label_prefix(text):
-    text = re.sub(r'^[\(\[]?[a-zA-Z0-9]+[\.\)\]]\s*', '', text)
-    text = re.sub(r'[?:]+', '', text)
-    text = re.sub(r'[_\s]{2,}', '', text)
-    return text.strip()
-
-def has_random_tag(text):
-    return "[random]" in text.lower()
-
-def load_anketuesit_choices():
-    # Merr kredencialet nga st.secrets
-    gcp_info = st.secrets["gcp_service_account"]
-    
+DATA_COLLECTION_METHODS = ["Face to face", "Telefon/Online"]
+CODING_MODES = [
+    "P1, P2, P3, ...",
+    "Q1, Q2, Q3, ...",
+    "Ruaj numërimin origjinal si në Word (A1, B2a, C1, …)"
+]
+RANKING_MODES = {
+    "Një pyetje për çdo renditje (punon në çdo version të Collect)": "compact",
+    "Widget-i i renditjes së ODK (rank)": "native"
+}
+EXTERNAL_LISTS_LABEL = "Listat e gjata si skedarë CSV (select_one_from_file)"
+EXTERNAL_LISTS_HELP = (
+    f"Lista e anketuesve dhe çdo listë me të paktën {EXTERNAL_LIST_MIN_OPTIONS} opsione "
+    "dërgohen si skedarë CSV që ngarkohen te Kobo në 'Media', bashkë me formularin. "
+    "Formulari del më i vogël dhe hapet më shpejt në tablet."
+)
+
+PARSE_CACHE_MAX_ENTRIES = 16
+COST_TOP_FIELDS = 10
+
+def upload_digest(content):
+    """Content address of an uploaded questionnaire."""
+    return hashlib.sha256(content).hexdigest()
+
+@st.cache_data(max_entries=PARSE_CACHE_MAX_ENTRIES, show_spinner=False)
+def parse_questionnaire(digest, _content):
+    """
+    Parse an uploaded .docx once per content hash.
+    Returns the line list, token stream, question labels, formatting problems and
+    warnings; the least recently used entries are evicted after
+    PARSE_CACHE_MAX_ENTRIES uploads.
+    """
+    lines = read_docx_lines(BytesIO(_content))
+    tokens = tokenize_lines(lines)
+    return {
+        "lines": lines,
+        "tokens": tokens,
+        "question_options": question_labels(tokens),
+        "lint_problems": lint_questionnaire(lines, tokens),
+        "lint_warnings": lint_warnings(lines, tokens)
+    }
+
+ROSTER_SPREADSHEET = "Sistemi i mbledhjes te te dhenave / Janar - Dhjetor 2025"
+ROSTER_WORKSHEET = "lists"
+ROSTER_RANGE = "E4:F"  # Kolona E (id) dhe F (emri), pa tre rreshtat e parë
+ROSTER_TTL_SECONDS = 15 * 60
+ROSTER_WAIT_SECONDS = 20
+ROSTER_SNAPSHOT_PATH = os.path.join(tempfile.gettempdir(), "anketuesit_roster.json")
+
+def fetch_anketuesit_roster(gcp_info):
+    """Read the enumerator roster from Google Sheets in a single range request."""
     # Deklaro scope të qartë për Google Sheets
     scopes = [
     "https://www.googleapis.com/auth/spreadsheets",
@@ -122,398 +98,161 @@ def load_anketuesit_choices():
     gc = gspread.authorize(credentials)
     
     # Hap dokumentin dhe worksheet-in
-    sheet = gc.open("Sistemi i mbledhjes te te dhenave / Janar - Dhjetor 2025").worksheet("lists")
+    sheet = gc.open(ROSTER_SPREADSHEET).worksheet(ROSTER_WORKSHEET)
 
-    ids = sheet.col_values(5)[3:]    # Kolona E
-    names = sheet.col_values(6)[3:]  # Kolona F
+    # Kolonat E dhe F me një kërkesë të vetme
+    rows = sheet.get(ROSTER_RANGE)
 
     # Mbaj vetëm rreshtat që kanë të dyja vlerat jo bosh
     choices = []
-    if ids is not None and names is not None:
-        for id_, name in zip(ids, names):
-            if id_ and name:
-                choices.append({"list_name": "anketuesit_list","name": id_.strip(), "label": name.strip()})
-    else:
-        st.error("Gabim: Nuk u gjetën të dhëna në kolonat E dhe F.")
-
-    return choices 
+    for row in rows:
+        if len(row) < 2:
+            continue
+        id_, name = row[0], row[1]
+        if id_ and name:
+            choices.append({"list_name": "anketuesit_list","name": id_.strip(), "label": name.strip()})
+
+    if not choices:
+        raise RuntimeError("Nuk u gjetën të dhëna në kolonat E dhe F.")
+    return choices
+
+@st.cache_resource
+def roster_store():
+    """Process-wide roster state shared by every session and rerun."""
+    return {
+        "lock": threading.Lock(),
+        "executor": ThreadPoolExecutor(max_workers=1),
+        "future": None,
+        "choices": None,
+        "fetched_at": 0.0
+    }
+
+def read_roster_snapshot():
+    """Last roster successfully fetched, as (choices, fetched_at); (None, 0.0) if missing."""
+    try:
+        with open(ROSTER_SNAPSHOT_PATH, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+        return snapshot["choices"], snapshot["fetched_at"]
+    except (OSError, ValueError, KeyError):
+        return None, 0.0
+
+def write_roster_snapshot(choices, fetched_at):
+    tmp_path = ROSTER_SNAPSHOT_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"choices": choices, "fetched_at": fetched_at}, f, ensure_ascii=False)
+    os.replace(tmp_path, ROSTER_SNAPSHOT_PATH)
+
+def refresh_roster(store, gcp_info):
+    choices = fetch_anketuesit_roster(gcp_info)
+    fetched_at = time.time()
+    with store["lock"]:
+        store["choices"] = choices
+        store["fetched_at"] = fetched_at
+    try:
+        write_roster_snapshot(choices, fetched_at)
+    except OSError:
+        pass
+    return choices
 
-def generate_qname(qnum, q_index, coding_mode):
+def prefetch_anketuesit_choices():
     """
-    Returns (qname, updated_q_index)
+    Start a background roster refresh unless the cached copy is younger than
+    ROSTER_TTL_SECONDS or a refresh is already in flight. Returns that refresh's future.
     """
+    store = roster_store()
+    with store["lock"]:
+        if store["choices"] is None:
+            store["choices"], store["fetched_at"] = read_roster_snapshot()
+
+        fresh = store["choices"] is not None and time.time() - store["fetched_at"] < ROSTER_TTL_SECONDS
+        in_flight = store["future"] is not None and not store["future"].done()
+        if not fresh and not in_flight:
+            # Merr kredencialet nga st.secrets në thread-in kryesor
+            gcp_info = st.secrets["gcp_service_account"]
+            store["future"] = store["executor"].submit(refresh_roster, store, gcp_info)
+        return store["future"]
 
-    # Case 1: No number in Word → always P1, P2…
-    if not qnum:
-        return f"P{q_index}", q_index + 1
-
-    qnum_clean = qnum.rstrip('.')
-
-    # Case 2: D-questions → ALWAYS preserved
-    if qnum_clean.upper().startswith("D"):
-        return qnum_clean, q_index
-
-    # Case 3: User wants original numbering
-    if coding_mode == "Ruaj numërimin origjinal si në Word (A1, B2a, C1, …)":
-        return qnum_clean, q_index
-
-    # Case 4: User wants Q1, Q2…
-    if coding_mode == "Q1, Q2, Q3, ...":
-        return f"Q{q_index}", q_index + 1
-
-    # Case 5: Default → P1, P2…
-    return f"P{q_index}", q_index + 1
-  
-def generate_xlsform(input_docx, output_xlsx, coding_mode, data_method=True, selected_questions=None):
-    ranking_labels = [
-        "Zgjedhja e parë", "Zgjedhja e dytë", "Zgjedhja e tretë",
-        "Zgjedhja e katërt", "Zgjedhja e pestë", "Zgjedhja e gjashtë",
-        "Zgjedhja e shtatë", "Zgjedhja e tetë", "Zgjedhja e nëntë",
-        "Zgjedhja e dhjetë", "Zgjedhja e njëmbëdhjetë", "Zgjedhja e dymbëdhjetë",
-        "Zgjedhja e trembëdhjetë", "Zgjedhja e katërmbëdhjetë", "Zgjedhja e pesëmbëdhjetë",
-        "Zgjedhja e gjashtëmbëdhjetë", "Zgjedhja e shtatëmëdhjetë", "Zgjedhja e tetëmbëdhjetë",
-        "Zgjedhja e nëntëmbëdhjetë", "Zgjedhja e njëzet", "Ekstra"
-    ]
-
-    doc = docx2python(input_docx)
-    lines = [line.strip() for line in doc.text.split('\n') if line.strip()]
-
-    survey = []
-    choices = []
-    skipped_other_questions = []
-    settings = [{'style': 'theme-grid no-text-transform'}]
+def load_anketuesit_choices():
+    """
+    Enumerator roster for anketuesit_list.
+    Served from memory or the last-good snapshot; a stale copy is returned while a
+    background refresh runs. Only a cold start with no snapshot waits on Google,
+    for at most ROSTER_WAIT_SECONDS.
+    """
+    future = prefetch_anketuesit_choices()
+    store = roster_store()
+    with store["lock"]:
+        choices = store["choices"]
+    if choices is not None:
+        return choices
+    return future.result(timeout=ROSTER_WAIT_SECONDS)
+
+def process_uploaded_docx(uploaded_bytesio, filename, data_method, selected_questions, coding_mode, tokens=None, external_lists=False, ranking_mode="compact"):
+    base_name = os.path.splitext(filename)[0]
+    generated_name = f"{base_name}_gjeneruar.xlsx"
 
-    survey.append({
-       "type": "start",
-        "name": "start"
-    })
-    
-    survey.append({
-       "type": "end",
-        "name": "end"
-    })
-    
-    if data_method:
-        survey.append({
-            "type": "geopoint",
-            "name": "GPS",
-            "label": "GPS",
-            "required": "true"
-    })
-           
-    # Add Anketuesi_ja question
-    survey.append({
-       "type": "select_one anketuesit_list",
-        "name": "Anketuesi_ja",
-        "label": "Anketuesi/ja",
-        "required": "true",
-        "appearance": "search"
-    })
-     # Add the dynamic choices
     try:
         anketuesit_choices = load_anketuesit_choices()
-        choices.extend(anketuesit_choices)
     except Exception as e:
-        raise RuntimeError(f"Gabim gjatë ngarkimit të listës së anketuesve: {e}")
-        
-    i = 0
-    q_index = 1
-    note_index = 1
-
-    while i < len(lines):
-        line = lines[i]
-
-        if line.lower().startswith("[note]"):
-            label = line[6:].strip()
-            survey.append({
-                "type": "note",
-                "name": f"note{note_index}",
-                "label": label
-            })
-            note_index += 1
-            i += 1
-            continue
-
-        # STEP 1: Extract all tags (like [single], [random], [hint:...])
-        tags = extract_tags(line)
-
-        # STEP 2: Parse those tags to understand type, hint, and randomization
-        q_type, matrix_count, parameters, hint = parse_question_tags(tags)
-
-        # STEP 3: Remove all tags from text so only question text remains
-        full_line = strip_type(line)
-
-        # STEP 4: Extract the question number and text
-        qnum, label_text = extract_question_number_and_text(full_line)
-       
-            # Skip if q_type is "other"
-        if q_type == "other":
-            # Collect label for display
-            full_line = strip_type(line)
-            _, label_text = extract_question_number_and_text(full_line)
-            if label_text:
-                skipped_other_questions.append(label_text)
-            i += 1
-            continue
-
-        if q_type:
-            if selected_questions is not None and label_text in selected_questions:
-                i += 1
-                continue
-
-            if qnum:
-                qnum = re.sub(r'\.\.+', '.', qnum).rstrip('.')
-
-            label = f"{qnum}. {label_text}" if qnum else full_line
-
-            qname, q_index = generate_qname(qnum, q_index, coding_mode)
-
-            qname = qname.rstrip('.')
-            required = "yes"
-
-            def add_common_question(fields):
-                if parameters:
-                    fields["parameters"] = parameters
-                if hint:
-                    fields["hint"] = hint
-                survey.append(fields)
-
-            def collect_options(start_index):
-                opts = []
-                while start_index < len(lines):
-                    tags = extract_tags(lines[start_index])
-                    next_type, _, _, _ = parse_question_tags(tags)
-
-                    if next_type:
-                        break
-                    opts.append(lines[start_index])
-                    start_index += 1
-                return opts, start_index
-
-            if q_type in ["single", "multiple"]:
-                list_name = qname + "_list"
-                qstyle = "select_one" if q_type == "single" else "select_multiple"
-                question = {
-                    "type": f"{qstyle} {list_name}",
-                    "name": qname,
-                    "label": label,
-                    "required": required
-                }
-                add_common_question(question)
-
-                i += 1
-                options, i = collect_options(i)
-                for idx, opt in enumerate(options, 1):
-                    clean = clean_label_prefix(opt)
-                    name_value = f"_{idx}" if q_type == "multiple" else str(idx)
-                    choices.append({
-                        "list_name": list_name,
-                        "name": name_value,
-                        "label": clean
-                    })
-                    if '_' in opt:
-                        open_name = f"{qname}_{idx}"
-                        relevant_expr = f"selected(${{{qname}}}, '{name_value}')" if q_type == "multiple" else f"${{{qname}}} = '{name_value}'"
-                        survey.append({
-                            "type": "text",
-                            "name": open_name,
-                            "label": f"{clean}",
-                            "relevant": relevant_expr,
-                            "required": "yes"
-                        })
-
-            elif q_type == "numeric":
-                add_common_question({
-                    "type": "integer",
-                    "name": qname,
-                    "label": label,
-                    "required": required
-                })
-                i += 1
-
-            elif q_type in ["text", "string"]:
-                add_common_question({
-                    "type": "text",
-                    "name": qname,
-                    "label": label,
-                    "required": required
-                })
-                i += 1
-
-            elif q_type.startswith("scale") and isinstance(matrix_count, dict):
-                start = matrix_count["start"]
-                end = matrix_count["end"]
-                min_label = matrix_count.get("min_label")
-                max_label = matrix_count.get("max_label")
-
-                list_name = f"scale_{start}_{end}"
-                question = {
-                    "type": f"select_one {list_name}",
-                    "name": qname,
-                    "label": label,
-                    "required": required,
-                    "appearance": "likert"
-                }
-                add_common_question(question)
-
-                if not any(c["list_name"] == list_name for c in choices):
-                    for j in range(start, end + 1):
-                        lbl = f"{j} - {min_label}" if j == start and min_label else \
-                              f"{j} - {max_label}" if j == end and max_label else str(j)
-                        choices.append({
-                            "list_name": list_name,
-                            "name": str(j),
-                            "label": lbl
-                        })
-                i += 1
-
-            elif "matrix" in q_type:
-                style = "select_one" if "single" in q_type else "select_multiple"
-                list_name = qname + "_matrix"
-                i += 1
-
-                columns = lines[i:i + matrix_count]
-                i += matrix_count
-
-                rows = []
-                while i < len(lines):
-                    tags = extract_tags(lines[i])
-                    next_type, _, _, _ = parse_question_tags(tags)
-                    if next_type:
-                        break
-                    rows.append(lines[i])
-                    i += 1
-
-                survey.append({"type": "begin_group", "name": f"{qname}_group", "appearance": "field-list", "required": "no"})
-                survey.append({"type": f"{style} {list_name}", "name": f"{qname}_matrix_label", "label": label, "appearance": "label", "required": "no"})
-
-                for idx, row in enumerate(rows, 1):
-                    field = {
-                        "type": f"{style} {list_name}",
-                        "name": f"{qname}_{idx}",
-                        "label": row,
-                        "appearance": "list-nolabel",
-                        "required": "yes"
-                    }
-                    if parameters:
-                        field["parameters"] = parameters
-                    survey.append(field)
-
-                survey.append({"type": "end_group", "name": f"{qname}_group_end"})
-
-                for j, col in enumerate(columns, 1):
-                    choices.append({"list_name": list_name, "name": str(j), "label": col})
-
-            elif q_type.startswith("ranking"):
-                match = re.findall(r"\d+", q_type)
-                if match:
-                    rank_count = int(match[0])
-                    list_name = qname + "_list"
-
-                    survey.append({"type": "begin_group", "name": f"{qname}_group", "appearance": "field-list"})
-                    survey.append({"type": "note", "name": f"{qname}_label", "label": label})
-
-                    for idx in range(1, rank_count + 1):
-                        rank_name = f"{qname}_{idx}"
-                        constraint = " and ".join([f"${rank_name} != ${qname}_{j}" for j in range(1, idx)]) if idx > 1 else ""
-                        constraint_msg = "Opsioni i njejtë nuk mund të zgjedhet më shumë se një herë"
-                        survey.append({
-                            "type": f"select_one {list_name}",
-                            "name": rank_name,
-                            "label": ranking_labels[idx - 1] if idx <= 20 else ranking_labels[-1],
-                            "required": "yes",
-                            "appearance": "minimal",
-                            "choice_filter": " and ".join([f"not(selected(${{{qname}_{j}}}, name))" for j in range(1, idx)])
-                        })
-
-                    survey.append({"type": "end_group", "name": f"{qname}_group_end"})
-
-                    i += 1
-                    options = []
-                    while i < len(lines):
-                        tags = extract_tags(lines[i])
-                        next_type, _, _, _ = parse_question_tags(tags)
-                        if next_type:
-                            break
-                        options.append(lines[i])
-                        i += 1
-
-                    for idx, opt in enumerate(options, 1):
-                        clean = clean_label_prefix(opt)
-                        choices.append({"list_name": list_name, "name": str(idx), "label": clean})
-                        
-            elif q_type is None:
-                raise ValueError(f"Formatimi i Word dokumentit nuk është valid në këtë linjë: '{line}'")
-        else:
-            i += 1
-
-    survey.append({"type": "text", "name": "emri_mbiemri", "label": "Emri dhe mbiemri:", "required": "yes"})
-    survey.append({"type": "text", "name": "numri_telefonit", "label": "Numri i telefonit:", "required": "yes"})
-
-    with pd.ExcelWriter(output_xlsx, engine='openpyxl') as writer:
-        pd.DataFrame(survey).to_excel(writer, sheet_name="survey", index=False)
-        if choices:
-            pd.DataFrame(choices).to_excel(writer, sheet_name="choices", index=False)
-        pd.DataFrame(settings).to_excel(writer, sheet_name="settings", index=False)
-
-    return skipped_other_questions
-
-
-def process_uploaded_docx(uploaded_bytesio, filename, data_method, selected_questions, coding_mode):
-    base_name = os.path.splitext(filename)[0]
-    generated_name = f"{base_name}_gjeneruar.xlsx"
-    temp_xlsx_path = os.path.join(tempfile.gettempdir(), generated_name)
+        return None, None, f"Gabim gjatë ngarkimit të listës së anketuesve: {e}", None, [], []
 
     try:
-        uploaded_bytesio.seek(0)
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".docx") as tmp:
-            tmp.write(uploaded_bytesio.read())
-            tmp.flush()
-            skipped = generate_xlsform(tmp.name, temp_xlsx_path, coding_mode, data_method, selected_questions)
-        return temp_xlsx_path, generated_name, None, skipped
+        if tokens is None:
+            uploaded_bytesio.seek(0)
+            tokens = tokenize_lines(read_docx_lines(uploaded_bytesio))
+        form = build_xlsform(tokens, coding_mode, data_method, selected_questions, anketuesit_choices, external_lists, ranking_mode)
+        # Kontrollo formularin para se të ofrohet për shkarkim
+        problems = validate_xlsform(form["survey"], form["choices"], form["attachments"])
+        # Sa i rëndë është formulari për tabletin
+        cost = estimate_form_cost(form["survey"], form["choices"])
+        files = form_files(generated_name, form)
+        if len(files) > 1:
+            # Formulari bashkë me skedarët CSV në një .zip
+            return zip_files(files), f"{base_name}_gjeneruar.zip", None, form["skipped_other_questions"], problems, cost
+        return files[generated_name], generated_name, None, form["skipped_other_questions"], problems, cost
     except Exception as e:
-        return None, None, str(e), None
+        return None, None, str(e), None, [], []
 
 if uploaded_file:
+    # Fillo marrjen e listës së anketuesve në sfond sa ngarkohet dokumenti
+    try:
+        prefetch_anketuesit_choices()
+    except Exception:
+        pass
+
     uploaded_content = uploaded_file.read()
     uploaded_bytesio = BytesIO(uploaded_content)
     uploaded_bytesio.seek(0)  # rifillon stream-in që të përdoret prapë
 
     data_collection_method = st.selectbox(
     "Metoda e mbledhjes së të dhënave:",
-    ["Face to face", "Telefon/Online"] 
+    DATA_COLLECTION_METHODS
     )
 
     coding_mode = st.radio(
     "Si të kodohen pyetjet që kanë numërim në Word?",
-    options=[
-        "P1, P2, P3, ...",
-        "Q1, Q2, Q3, ...",
-        "Ruaj numërimin origjinal si në Word (A1, B2a, C1, …)"
-    ], index=0)
+    options=CODING_MODES, index=0)
 
+    ranking_mode = st.selectbox("Pyetjet [ranking]:", list(RANKING_MODES))
+    external_lists = st.checkbox(EXTERNAL_LISTS_LABEL, help=EXTERNAL_LISTS_HELP)
 
-    doc = docx2python(uploaded_bytesio).text
-    lines = [line.strip() for line in doc.split('\n') if line.strip()]
+    # Parsed once per upload; widget reruns hit the cache
+    parsed = parse_questionnaire(upload_digest(uploaded_content), uploaded_content)
+    lines = parsed["lines"]
+    tokens = parsed["tokens"]
 
-    # Extract question numbers (e.g., 1, D1, 2a, Q1.2 etc.)
-    question_options = []
-    for line in lines:
-        try:
-            # Extract all tags from this line (e.g., [random][single][hint: ...])
-            tags = extract_tags(line)
-            q_type, _, _, _ = parse_question_tags(tags)
-
-            # Only process lines that define a question type
-            if q_type:
-                _, label_text = extract_question_number_and_text(strip_type(line))
-                if label_text:
-                    question_options.append(label_text)
-
-        except ValueError as e:
-            st.error(f"Gabim në rreshtin: **{line}**\n\n{str(e)}")
-            st.stop()
+    # Extract question labels (e.g., 1, D1, 2a, Q1.2 etc.)
+    question_options = parsed["question_options"]
 
+    # Të gjitha gabimet e formatimit njëherësh, para gjenerimit
+    if parsed["lint_problems"]:
+        st.error(f"Dokumenti ka {len(parsed['lint_problems'])} probleme formatimi. Rregulloji në Word dhe ngarkoje përsëri:")
+        for problem in parsed["lint_problems"]:
+            st.markdown(f"- {format_lint_problem(problem)}")
+    if parsed["lint_warnings"]:
+        st.warning(f"{len(parsed['lint_warnings'])} kllapa jashtë pyetjeve nuk njihen; kontrolloji nëse janë tag-e të shkruara gabim:")
+        for problem in parsed["lint_warnings"]:
+            st.markdown(f"- {format_lint_problem(problem)}")
 
     st.session_state["question_lines"] = lines
     selected_questions = st.multiselect(
@@ -530,27 +269,112 @@ if uploaded_file:
             with st.spinner("Po përpunon dokumentin..."):
                 data_method = data_collection_method == "Face to face"
                 uploaded_bytesio.seek(0)
-                xlsx_path, generated_file_name, error, skipped = process_uploaded_docx(uploaded_bytesio, uploaded_file.name, data_method, st.session_state.get("selected_questions", None), coding_mode)
+                xlsx_data, generated_file_name, error, skipped, problems, cost = process_uploaded_docx(uploaded_bytesio, uploaded_file.name, data_method, st.session_state.get("selected_questions", None), coding_mode, tokens=tokens, external_lists=external_lists, ranking_mode=RANKING_MODES[ranking_mode])
         
                 if error:
                     st.error(f"Gabimi: {error}")
                 else:
-                    with open(xlsx_path, "rb") as f:
-                        st.session_state["xlsx_data"] = f.read()
-                        st.session_state["xlsx_name"] = generated_file_name
-                        st.session_state["xlsx_ready"] = True
-                        st.session_state["skipped_other_questions"] = skipped
+                    st.session_state["xlsx_data"] = xlsx_data
+                    st.session_state["xlsx_name"] = generated_file_name
+                    st.session_state["xlsx_ready"] = True
+                    st.session_state["skipped_other_questions"] = skipped
+                    st.session_state["validation_problems"] = problems
+                    st.session_state["form_cost"] = cost
         if st.session_state.get("xlsx_ready", False):
             st.success("Formulari XLS u gjenerua me sukses!")
+            if st.session_state.get("validation_problems"):
+                st.warning(f"Validimi gjeti {len(st.session_state['validation_problems'])} probleme që Kobo mund t'i refuzojë:")
+                for problem in st.session_state["validation_problems"]:
+                    st.markdown(f"- {format_problem(problem)}")
+            is_zip = st.session_state["xlsx_name"].endswith(".zip")
+            if is_zip:
+                st.info("Ngarko formularin XLS te Kobo dhe skedarët CSV te 'Media' e projektit.")
             st.download_button(
                 label="Shkarko formularin XLS",
                 data=st.session_state["xlsx_data"],
                 file_name=st.session_state["xlsx_name"],
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                mime="application/zip" if is_zip else "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
             )
+            if st.session_state.get("form_cost"):
+                with st.expander("Pesha e formularit në tablet (fushat më të rënda)"):
+                    for entry in st.session_state["form_cost"][:COST_TOP_FIELDS]:
+                        st.markdown(f"- {format_cost_entry(entry)}")
+                    st.download_button(
+                        label="Shkarko raportin e peshës (.csv)",
+                        data=cost_report_csv(st.session_state["form_cost"]),
+                        file_name=f"{os.path.splitext(st.session_state['xlsx_name'])[0]}_kosto.csv",
+                        mime="text/csv"
+                    )
             if st.session_state.get("skipped_other_questions"):
                 st.info("Pyetjet me tag-un [other] që u anashkaluan:")
                 for q in st.session_state["skipped_other_questions"]:
                     st.markdown(f"- {q}")
 
 
+st.markdown("---")
+st.subheader("Gjenerim në grup")
+st.markdown("Ngarko një `.zip` me dokumente `.docx` (ose disa dokumente njëherësh). Formularët kthehen në një `.zip` bashkë me raportin e gabimeve.")
+
+bulk_files = st.file_uploader(
+    "Zgjidh `.zip` ose dokumente `.docx`:",
+    type=["zip", "docx"],
+    accept_multiple_files=True,
+    key="bulk_upload"
+)
+
+if bulk_files:
+    bulk_method = st.selectbox("Metoda e mbledhjes së të dhënave:", DATA_COLLECTION_METHODS, key="bulk_method")
+    bulk_coding_mode = st.radio("Si të kodohen pyetjet që kanë numërim në Word?", options=CODING_MODES, index=0, key="bulk_coding_mode")
+    bulk_ranking_mode = st.selectbox("Pyetjet [ranking]:", list(RANKING_MODES), key="bulk_ranking_mode")
+    bulk_external_lists = st.checkbox(EXTERNAL_LISTS_LABEL, help=EXTERNAL_LISTS_HELP, key="bulk_external_lists")
+
+    if st.button("Gjenero të gjithë formularët", key="bulk_generate"):
+        questionnaires = []
+        for bulk_file in bulk_files:
+            if bulk_file.name.lower().endswith(".zip"):
+                questionnaires.extend(iter_questionnaires(bulk_file.getvalue()))
+            else:
+                questionnaires.append((bulk_file.name, bulk_file.getvalue()))
+
+        if not questionnaires:
+            st.error("Nuk u gjet asnjë dokument `.docx`.")
+            st.stop()
+
+        # Lista e anketuesve merret një herë për të gjithë dokumentet
+        try:
+            anketuesit_choices = load_anketuesit_choices()
+        except Exception as e:
+            st.error(f"Gabim gjatë ngarkimit të listës së anketuesve: {e}")
+            st.stop()
+
+        progress = st.progress(0, text=f"Po gjenerohen formularët... 0/{len(questionnaires)}")
+        zip_bytes, results = generate_xlsform_bulk(
+            questionnaires,
+            bulk_coding_mode,
+            bulk_method == "Face to face",
+            anketuesit_choices,
+            on_progress=lambda done, total: progress.progress(done / total, text=f"Po gjenerohen formularët... {done}/{total}"),
+            external_lists=bulk_external_lists,
+            ranking_mode=RANKING_MODES[bulk_ranking_mode]
+        )
+        progress.empty()
+
+        st.session_state["bulk_zip"] = zip_bytes
+        st.session_state["bulk_errors"] = [(filename, error) for filename, _, _, _, _, _, error in results if error]
+        st.session_state["bulk_problem_count"] = sum(1 for result in results if result[4])
+        st.session_state["bulk_total"] = len(results)
+
+    if st.session_state.get("bulk_zip"):
+        bulk_errors = st.session_state["bulk_errors"]
+        bulk_total = st.session_state["bulk_total"]
+        st.success(f"U gjeneruan {bulk_total - len(bulk_errors)} nga {bulk_total} formularë.")
+        for filename, error in bulk_errors:
+            st.error(f"{filename}: {error}")
+        if st.session_state.get("bulk_problem_count"):
+            st.warning(f"{st.session_state['bulk_problem_count']} formularë kanë probleme validimi; shih raportin në `.zip`.")
+        st.download_button(
+            label="Shkarko formularët (.zip)",
+            data=st.session_state["bulk_zip"],
+            file_name="formularet_gjeneruar.zip",
+            mime="application/zip"
+        )
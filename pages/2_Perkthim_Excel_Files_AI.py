@@ -1,10 +1,17 @@
 import pandas as pd
 import streamlit as st
 from io import BytesIO
-import re
 import os
-import time
-import google.generativeai as genai
+import hashlib
+from functools import partial
+from kobo_automation.gemini import (
+    LANGUAGE_OPTIONS_UI, TRANSLATION_MODEL_NAME, TRANSLATION_RPM, TRANSLATION_TPM,
+    calculate_gemini_cost, configure, generative_model
+)
+from kobo_automation.glossary import project_glossary
+from kobo_automation.translation import MAX_WORKERS, translate_dataframe, translate_dataframe_multi
+from kobo_automation.translation_memory import TranslationCheckpoint, TranslationMemory, checkpoint_job
+from kobo_automation.workbook import changed_cells, patch_workbook
 
 
 
@@ -35,142 +42,82 @@ with st.sidebar:
     """, unsafe_allow_html=True)
     
 GEMINI_TRANSLATION_API_KEY = st.secrets["GEMINI_TRANSLATION_API_KEY"]
-genai.configure(api_key=GEMINI_TRANSLATION_API_KEY)
-
-GEMINI_PRICING = {
-    "models/gemini-2.5-flash": {
-        "inputPer1MTokens":  0.30,
-        "outputPer1MTokens": 2.50,
-    },
-    "models/gemini-3.1-flash-lite-preview": {
-        "inputPer1MTokens":  0.25,
-        "outputPer1MTokens": 1.50,
-    },
-}
-
-
-def calculate_gemini_cost(prompt_tokens: int, completion_tokens: int, model: str) -> float:
-    pricing = GEMINI_PRICING.get(model, GEMINI_PRICING["models/gemini-2.5-flash"])
-    input_rate  = pricing["inputPer1MTokens"]
-    output_rate = pricing["outputPer1MTokens"]
-    input_cost  = ((prompt_tokens     or 0) / 1_000_000) * input_rate
-    output_cost = ((completion_tokens or 0) / 1_000_000) * output_rate
-    return input_cost + output_cost
-
-LANGUAGE_OPTIONS_UI = {
-    "Gjuha Shqipe": "sq",
-    "Gjuha Angleze": "en",
-    "Gjuha Serbe": "sr",
-    "Gjuha Maqedonase": "mk",
-    "Gjuha Boshnjake": "bs"
-
-}
-
-def adjust_question_code(text, from_lang, to_lang):
-    match = re.match(r'^(Q\d+[a-zA-Z]?|P\d+[a-zA-Z]?)(.*)', str(text))
-    if match:
-        code = match.group(1)
-        rest = match.group(2)
-        if from_lang == "en" and to_lang in ["sq", "sr", "mk"]:
-            code = code.replace("Q", "P")
-        elif from_lang == "sq" and to_lang == "en":
-            code = code.replace("P", "Q")
-        elif from_lang == "en" and to_lang == "sr":
-            code = code.replace("Q", "P")
-        return code, rest
-    else:
-        return '', text
-
-LANG_NAMES = {
-    "sq": "Albanian",
-    "en": "English",
-    "sr": "Serbian (Latin script)",
-    "mk": "Macedonian (Latin script)",
-    "bs": "Bosnian"
-}
-
-MODEL_NAME = "gemini-3.1-flash-lite-preview"
-gemini_model = genai.GenerativeModel(MODEL_NAME)
-
-
-BATCH_SIZE = 50
-
-
-def translate_dataframe(df, source_col, target_col, from_lang, to_lang):
-    total_in, total_out = 0, 0
-    errors = []
-    results = list(df[source_col].values)
-
-    # Collect texts that need translation
-    to_translate = []
-    for i, val in enumerate(results):
-        if pd.isna(val) or not str(val).strip() or str(val).strip().lower() == "none":
-            continue
-        code, remaining = adjust_question_code(str(val), from_lang, to_lang)
-        if not remaining.strip():
-            results[i] = code + remaining
-            continue
-        to_translate.append((i, code, remaining.strip()))
-
-    if not to_translate:
-        df[target_col] = results
-        return df, 0, 0, []
-
-    from_name = LANG_NAMES.get(from_lang, from_lang)
-    to_name = LANG_NAMES.get(to_lang, to_lang)
+configure(api_key=GEMINI_TRANSLATION_API_KEY)
 
+MODEL_NAME = TRANSLATION_MODEL_NAME
+gemini_model = generative_model(MODEL_NAME)
+
+
+def translation_progress():
+    """Progress bar plus the on_progress callback that drives it."""
     progress = st.progress(0, text="Duke përkthyer... 0%")
 
-    for batch_start in range(0, len(to_translate), BATCH_SIZE):
-        batch = to_translate[batch_start:batch_start + BATCH_SIZE]
-        texts = [text for _, _, text in batch]
+    def update(done, total):
+        progress.progress(done / total, text=f"Duke përkthyer... {done}/{total}")
+
+    return progress, update
+
+
+WORKBOOK_CACHE_MAX_ENTRIES = 8
+GLOSSARY_LABEL = "Përdor fjalorin e termave"
+GLOSSARY_HELP = (
+    "Emrat e institucioneve dhe termat zyrtarë të pyetësorëve dërgohen te modeli "
+    "vetëm në kërkesat ku shfaqen, që përkthimi i tyre të jetë i njëjtë kudo."
+)
+
+def upload_digest(content):
+    """Content address of an uploaded workbook."""
+    return hashlib.sha256(content).hexdigest()
+
+@st.cache_data(max_entries=WORKBOOK_CACHE_MAX_ENTRIES, show_spinner=False)
+def load_workbook(digest, _content):
+    """Parse every sheet of an uploaded workbook in one pass, once per content hash."""
+    return pd.read_excel(BytesIO(_content), sheet_name=None)
+
+def workbook_bytes(content, original_sheets, sheets, translated_columns, sheet_names):
+    """
+    The .xlsx download, built only when the download button is clicked: the
+    translated cells patched into the uploaded workbook, or every sheet re-written
+    with pandas when the workbook cannot be patched.
+    """
+    changes = {
+        sheet: changed_cells(original_sheets[sheet], sheets[sheet], columns)
+        for sheet, columns in translated_columns.items()
+    }
+    try:
+        return patch_workbook(content, changes)
+    except ValueError:
+        pass
 
-        numbered_texts = "\n".join(f"[{j+1}] {t}" for j, t in enumerate(texts))
-        prompt = (
-            f"{from_name} to {to_name}. Reply [N] translation only.\n\n{numbered_texts}"
-        )
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine="openpyxl") as writer:
+        for sheet in sheet_names:
+            sheets[sheet].to_excel(writer, sheet_name=sheet, index=False)
+    return output.getvalue()
 
-        try:
-            response = gemini_model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(temperature=0.1, max_output_tokens=4096),
-            )
-            in_tok = getattr(response.usage_metadata, "prompt_token_count", 0) or 0
-            out_tok = getattr(response.usage_metadata, "candidates_token_count", 0) or 0
-            total_in += in_tok
-            total_out += out_tok
-
-            translations = {}
-            for line in response.text.strip().split("\n"):
-                m = re.match(r"\[(\d+)\]\s*(.*)", line.strip())
-                if m:
-                    translations[int(m.group(1))] = m.group(2).strip()
-
-            for j, (idx, code, _) in enumerate(batch):
-                if (j + 1) in translations:
-                    results[idx] = code + translations[j + 1]
-        except Exception as e:
-            errors.append(str(e))
-
-        done = min(batch_start + BATCH_SIZE, len(to_translate))
-        pct = done / len(to_translate)
-        progress.progress(pct, text=f"Duke përkthyer... {done}/{len(to_translate)}")
-
-    progress.empty()
-    df[target_col] = results
-    return df, total_in, total_out, errors
 
 st.title("Fillo me Përkthimin e Pyetësorëve")
 
+with st.expander("Kuota e Gemini"):
+    max_workers = st.number_input("Kërkesa paralele", min_value=1, max_value=32, value=MAX_WORKERS)
+    rpm_limit = st.number_input("Kërkesa në minutë (RPM)", min_value=1, value=TRANSLATION_RPM)
+    tpm_limit = st.number_input("Tokena në minutë (TPM)", min_value=1000, value=TRANSLATION_TPM, step=100_000)
+
+use_glossary = st.checkbox(GLOSSARY_LABEL, value=True, help=GLOSSARY_HELP)
+
 uploaded_file = st.file_uploader("Ngarko Excel-in", type=["xlsx"])
 
 if uploaded_file:
-    xls = pd.ExcelFile(uploaded_file)
-    sheet_names = xls.sheet_names
-    all_sheets = {sheet: pd.read_excel(uploaded_file, sheet_name=sheet) for sheet in sheet_names}
-
-    if "translated_sheets" not in st.session_state:
+    content = uploaded_file.getvalue()
+    workbook_hash = upload_digest(content)[:16]
+    all_sheets = load_workbook(workbook_hash, content)
+    sheet_names = list(all_sheets)
+
+    # A new upload starts from its own sheets
+    if st.session_state.get("workbook_hash") != workbook_hash:
+        st.session_state.workbook_hash = workbook_hash
         st.session_state.translated_sheets = {sheet: df.copy() for sheet, df in all_sheets.items()}
+        st.session_state.translated_columns = {}
 
     if "translation_blocks" not in st.session_state:
         st.session_state.translation_blocks = [0]
@@ -197,19 +144,45 @@ if uploaded_file:
             lang_label = st.selectbox(f"Gjuha për kolonën: {target_col} (Blloku {block_id + 1})", list(LANGUAGE_OPTIONS_UI.keys()), key=f"{target_col}_lang_{block_id}")
             target_languages.append((target_col, LANGUAGE_OPTIONS_UI[lang_label]))
 
+        fan_out = len(target_languages) > 1 and st.checkbox(
+            f"Të gjitha gjuhët në një kërkesë (Blloku {block_id + 1})",
+            value=True,
+            key=f"fan_out_{block_id}",
+            help="Çdo tekst dërgohet një herë për të gjitha kolonat, në vend të një kërkese për secilën gjuhë."
+        )
+
         if st.button(f"Fillo Përkthimin për {selected_sheet} (Blloku {block_id + 1})", key=f"translate_btn_{block_id}"):
             block_in_tokens, block_out_tokens = 0, 0
             all_errors = []
-            for target_col, to_lang in target_languages:
-                df, in_tok, out_tok, errors = translate_dataframe(df, source_col, target_col, from_lang=from_lang, to_lang=to_lang)
-                block_in_tokens += in_tok
-                block_out_tokens += out_tok
-                all_errors.extend(errors)
-
+            memory = TranslationMemory(MODEL_NAME)
+            dedup_stats = {"texts": 0, "unique": 0, "resumed": 0}
+            checkpoint = TranslationCheckpoint(checkpoint_job(workbook_hash, selected_sheet, source_col))
+            glossary = project_glossary() if use_glossary else None
+            if fan_out:
+                progress, on_progress = translation_progress()
+                df, block_in_tokens, block_out_tokens, all_errors = translate_dataframe_multi(df, source_col, target_languages, from_lang=from_lang, model=gemini_model, on_progress=on_progress, memory=memory, stats=dedup_stats, max_workers=int(max_workers), rpm=int(rpm_limit), tpm=int(tpm_limit), checkpoint=checkpoint, glossary=glossary)
+                progress.empty()
+            else:
+                for target_col, to_lang in target_languages:
+                    progress, on_progress = translation_progress()
+                    df, in_tok, out_tok, errors = translate_dataframe(df, source_col, target_col, from_lang=from_lang, to_lang=to_lang, model=gemini_model, on_progress=on_progress, memory=memory, stats=dedup_stats, max_workers=int(max_workers), rpm=int(rpm_limit), tpm=int(tpm_limit), checkpoint=checkpoint, glossary=glossary)
+                    progress.empty()
+                    block_in_tokens += in_tok
+                    block_out_tokens += out_tok
+                    all_errors.extend(errors)
+
+            # Completed batches are kept even when others failed; the checkpoint resumes the rest
+            st.session_state.translated_sheets[selected_sheet] = df.copy()
+            st.session_state.translated_columns.setdefault(selected_sheet, set()).update(
+                target_col for target_col, _ in target_languages
+            )
             if all_errors:
-                st.error(f"Ka pasur {len(all_errors)} gabime. Gabimi i parë: {all_errors[0]}")
+                st.error(
+                    f"Ka pasur {len(all_errors)} gabime. Gabimi i parë: {all_errors[0]}  \n"
+                    f"Përkthimet e kryera u ruajtën; kliko përsëri butonin për të vazhduar nga aty ku u ndal."
+                )
             else:
-                st.session_state.translated_sheets[selected_sheet] = df.copy()
+                checkpoint.clear()
                 st.success(f"Përkthimi për {selected_sheet} u krye me sukses në Bllokun {block_id + 1}!")
 
             st.write(df.head())
@@ -219,7 +192,11 @@ if uploaded_file:
             st.info(
                 f"**Kostoja e Bllokut {block_id + 1}:**  \n"
                 f"Input tokens: **{block_in_tokens:,}** | Output tokens: **{block_out_tokens:,}**  \n"
-                f"Kostoja: **${block_cost:.4f}**"
+                f"Kostoja: **${block_cost:.4f}**  \n"
+                f"Rifilluar nga përkthimi i ndërprerë: **{dedup_stats['resumed']:,}** tekste  \n"
+                f"Nga memoria e përkthimeve: **{memory.hits:,}** nga **{memory.hits + memory.misses:,}** tekste ({memory.hit_rate():.0%})  \n"
+                f"Tekste unike: **{dedup_stats['unique']:,}** nga **{dedup_stats['texts']:,}** "
+                f"({dedup_stats['texts'] / max(dedup_stats['unique'], 1):.1f}× më pak)"
             )
 
         if block_id == len(st.session_state.translation_blocks) - 1:
@@ -227,13 +204,12 @@ if uploaded_file:
             if add_block:
                 st.session_state.translation_blocks.append(len(st.session_state.translation_blocks))
 
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine="openpyxl") as writer:
-        for sheet in sheet_names:
-            st.session_state.translated_sheets.get(sheet, all_sheets[sheet]).to_excel(writer, sheet_name=sheet, index=False)
-
     st.download_button(
         label="Shkarko Excel-in me të gjitha përkthimet",
-        data=output.getvalue(),
-        file_name=uploaded_file.name
+        data=partial(
+            workbook_bytes, content, all_sheets, {**all_sheets, **st.session_state.translated_sheets},
+            dict(st.session_state.translated_columns), sheet_names
+        ),
+        file_name=uploaded_file.name,
+        on_click="ignore"
     )
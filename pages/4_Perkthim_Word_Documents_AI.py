@@ -1,10 +1,13 @@
 import streamlit as st
 from io import BytesIO
 import os
-import re
-import time
-import google.generativeai as genai
 from docx import Document
+from kobo_automation.gemini import (
+    LANGUAGE_OPTIONS_UI, TRANSLATION_MODEL_NAME, calculate_gemini_cost, configure, generative_model
+)
+from kobo_automation.glossary import project_glossary
+from kobo_automation.translation import translate_docx_in_place
+from kobo_automation.translation_memory import TranslationMemory
 
 st.set_page_config(page_title="Përkthe Word Dokumente me AI", layout="centered")
 
@@ -32,128 +35,27 @@ with st.sidebar:
 
 
 GEMINI_TRANSLATION_API_KEY = st.secrets["GEMINI_TRANSLATION_API_KEY"]
-genai.configure(api_key=GEMINI_TRANSLATION_API_KEY)
-
-GEMINI_PRICING = {
-    "models/gemini-2.5-flash": {
-        "inputPer1MTokens":  0.30,
-        "outputPer1MTokens": 2.50,
-    },
-}
-
-
-def calculate_gemini_cost(prompt_tokens: int, completion_tokens: int, model: str) -> float:
-    pricing = GEMINI_PRICING.get(model, GEMINI_PRICING["models/gemini-2.5-flash"])
-    input_rate  = pricing["inputPer1MTokens"]
-    output_rate = pricing["outputPer1MTokens"]
-    input_cost  = ((prompt_tokens     or 0) / 1_000_000) * input_rate
-    output_cost = ((completion_tokens or 0) / 1_000_000) * output_rate
-    return input_cost + output_cost
-
-
-LANGUAGE_OPTIONS_UI = {
-    "Gjuha Shqipe": "sq",
-    "Gjuha Angleze": "en",
-    "Gjuha Serbe": "sr",
-    "Gjuha Maqedonase": "mk",
-    "Gjuha Boshnjake": "bs"
-}
-
-LANG_NAMES = {
-    "sq": "Albanian",
-    "en": "English",
-    "sr": "Serbian (Latin script)",
-    "mk": "Macedonian (Latin script)",
-    "bs": "Bosnian"
-}
-
-MODEL_NAME = "gemini-3.1-flash-lite-preview"
-gemini_model = genai.GenerativeModel(MODEL_NAME)
-
-
-BATCH_SIZE = 50
-
-
-def translate_batch(texts, from_lang, to_lang):
-    """Translate a batch of texts in one API call. Returns (translations_dict, in_tok, out_tok, error)."""
-    from_name = LANG_NAMES.get(from_lang, from_lang)
-    to_name = LANG_NAMES.get(to_lang, to_lang)
-
-    numbered_texts = "\n".join(f"[{j+1}] {t}" for j, t in enumerate(texts))
-    prompt = (
-        f"{from_name} to {to_name}. Reply [N] translation only.\n\n{numbered_texts}"
-    )
-
-    response = gemini_model.generate_content(
-        prompt,
-        generation_config=genai.types.GenerationConfig(temperature=0.1, max_output_tokens=4096),
-    )
-    in_tok = getattr(response.usage_metadata, "prompt_token_count", 0) or 0
-    out_tok = getattr(response.usage_metadata, "candidates_token_count", 0) or 0
-
-    translations = {}
-    for line in response.text.strip().split("\n"):
-        m = re.match(r"\[(\d+)\]\s*(.*)", line.strip())
-        if m:
-            translations[int(m.group(1))] = m.group(2).strip()
-
-    return translations, in_tok, out_tok
-
-
-def translate_docx_in_place(doc, from_lang, to_lang):
-    total_in, total_out = 0, 0
-    errors = []
-
-    # Collect full paragraph text (not individual runs) for better translation
-    # Each entry: (paragraph, full_text)
-    para_entries = []
-
-    for para in doc.paragraphs:
-        text = para.text.strip()
-        if text:
-            para_entries.append(("para", para, text))
-
-    for table in doc.tables:
-        for row in table.rows:
-            for cell in row.cells:
-                for para in cell.paragraphs:
-                    text = para.text.strip()
-                    if text:
-                        para_entries.append(("cell", para, text))
-
-    if not para_entries:
-        return doc, 0, 0, []
+configure(api_key=GEMINI_TRANSLATION_API_KEY)
+
+MODEL_NAME = TRANSLATION_MODEL_NAME
+gemini_model = generative_model(MODEL_NAME)
 
-    progress = st.progress(0, text="Duke përkthyer... 0%")
 
-    for batch_start in range(0, len(para_entries), BATCH_SIZE):
-        batch = para_entries[batch_start:batch_start + BATCH_SIZE]
-        texts = [text for _, _, text in batch]
+def translation_progress():
+    """Progress bar plus the on_progress callback that drives it."""
+    progress = st.progress(0, text="Duke përkthyer... 0%")
 
-        try:
-            translations, in_tok, out_tok = translate_batch(texts, from_lang, to_lang)
-            total_in += in_tok
-            total_out += out_tok
+    def update(done, total):
+        progress.progress(done / total, text=f"Duke përkthyer... {done}/{total}")
 
-            for j, (_, para, _) in enumerate(batch):
-                if (j + 1) in translations:
-                    translated = translations[j + 1]
-                    # Put all translated text in first run, clear the rest
-                    if para.runs:
-                        para.runs[0].text = translated
-                        for run in para.runs[1:]:
-                            run.text = ""
-                    else:
-                        para.text = translated
-        except Exception as e:
-            errors.append(str(e))
+    return progress, update
 
-        done = min(batch_start + BATCH_SIZE, len(para_entries))
-        pct = done / len(para_entries)
-        progress.progress(pct, text=f"Duke përkthyer... {done}/{len(para_entries)}")
 
-    progress.empty()
-    return doc, total_in, total_out, errors
+GLOSSARY_LABEL = "Përdor fjalorin e termave"
+GLOSSARY_HELP = (
+    "Emrat e institucioneve dhe termat zyrtarë të pyetësorëve dërgohen te modeli "
+    "vetëm në kërkesat ku shfaqen, që përkthimi i tyre të jetë i njëjtë kudo."
+)
 
 
 st.title("Fillo me Përkthimin e Pyetësorëve")
@@ -165,10 +67,15 @@ if uploaded_file:
     to_lang_label = st.selectbox("Gjuha për Përkthim", list(LANGUAGE_OPTIONS_UI.keys()), key="word_lang_to")
     from_lang = LANGUAGE_OPTIONS_UI[from_lang_label]
     to_lang = LANGUAGE_OPTIONS_UI[to_lang_label]
+    use_glossary = st.checkbox(GLOSSARY_LABEL, value=True, help=GLOSSARY_HELP)
 
     if st.button("Përkthe Word Dokumentin"):
         doc = Document(uploaded_file)
-        translated_doc, total_in, total_out, errors = translate_docx_in_place(doc, from_lang, to_lang)
+        memory = TranslationMemory(MODEL_NAME)
+        dedup_stats = {"texts": 0, "unique": 0}
+        progress, on_progress = translation_progress()
+        translated_doc, total_in, total_out, errors = translate_docx_in_place(doc, from_lang, to_lang, gemini_model, on_progress=on_progress, memory=memory, stats=dedup_stats, glossary=project_glossary() if use_glossary else None)
+        progress.empty()
 
         output = BytesIO()
         translated_doc.save(output)
@@ -184,7 +91,10 @@ if uploaded_file:
         st.info(
             f"**Kostoja:**  \n"
             f"Input tokens: **{total_in:,}** | Output tokens: **{total_out:,}**  \n"
-            f"Kostoja: **${cost:.4f}**"
+            f"Kostoja: **${cost:.4f}**  \n"
+            f"Nga memoria e përkthimeve: **{memory.hits:,}** nga **{memory.hits + memory.misses:,}** tekste ({memory.hit_rate():.0%})  \n"
+            f"Tekste unike: **{dedup_stats['unique']:,}** nga **{dedup_stats['texts']:,}** "
+            f"({dedup_stats['texts'] / max(dedup_stats['unique'], 1):.1f}× më pak)"
         )
 
         st.download_button(
@@ -1,10 +1,13 @@
 import os
 import streamlit as st
 import pandas as pd
-import google.generativeai as genai
 import io
 import re
-from collections import Counter, OrderedDict
+from kobo_automation.gemini import calculate_gemini_cost, configure, generative_model, generation_config
+from kobo_automation.categorize import (
+    DEFAULT_PROMPT, MAX_RETRIES, categorize_column, consolidate_labels, is_new_label,
+    normalize_labels, promoted_categories
+)
 
 # -------------------------------
 # Page Configuration
@@ -39,72 +42,13 @@ with st.sidebar:
 
 # ── Gemini API setup ─────────────────────────────────────────────────────────
 GEMINI_API_KEY = st.secrets["GEMINI_API_KEY"]
-genai.configure(api_key=GEMINI_API_KEY)
-
-# ── Pricing ──────────────────────────────────────────────────────────────────
-GEMINI_PRICING = {
-    "models/gemini-2.5-pro": {
-        "inputPer1MTokens_low":   1.25,
-        "outputPer1MTokens_low":  10.00,
-        "inputPer1MTokens_high":  2.50,
-        "outputPer1MTokens_high": 15.00,
-        "tier_threshold": 200_000,
-    },
-    "models/gemini-2.5-flash": {
-        "inputPer1MTokens":  0.30,
-        "outputPer1MTokens": 2.50,
-    },
-    "models/gemini-3.1-flash-lite-preview": {
-        "inputPer1MTokens":  0.25,
-        "outputPer1MTokens": 1.50,
-    },
-}
-
-
-def calculate_gemini_cost(prompt_tokens: int, completion_tokens: int, model: str) -> float:
-    pricing = GEMINI_PRICING.get(model, GEMINI_PRICING["models/gemini-2.5-pro"])
-    if "tier_threshold" in pricing:
-        high = (prompt_tokens or 0) > pricing["tier_threshold"]
-        input_rate  = pricing["inputPer1MTokens_high"]  if high else pricing["inputPer1MTokens_low"]
-        output_rate = pricing["outputPer1MTokens_high"] if high else pricing["outputPer1MTokens_low"]
-    else:
-        input_rate  = pricing["inputPer1MTokens"]
-        output_rate = pricing["outputPer1MTokens"]
-    input_cost  = ((prompt_tokens     or 0) / 1_000_000) * input_rate
-    output_cost = ((completion_tokens or 0) / 1_000_000) * output_rate
-    return round(input_cost + output_cost, 8)
+configure(api_key=GEMINI_API_KEY)
 
 
 # ── Page header ──────────────────────────────────────────────────────────────
 st.title("Grupimi i pyetjeve të hapura")
 st.markdown("Ngarko një dokument Excel me përgjigje të hapura. Aplikacioni do t'i kategorizojë automatikisht duke përdorur Gemini API.")
 
-# ── Default prompt ────────────────────────────────────────────────────────────
-DEFAULT_PROMPT = """You are a survey response categorizer. Your ONLY task is to assign exactly ONE category from the provided list to each survey response.
-
-Question: {question_label}
-
-Available categories (use these EXACT names — copy-paste, do not rephrase):
-{categories}
-
-CRITICAL RULES FOR CONSISTENCY:
-1. You MUST copy-paste category names EXACTLY as listed above. Do NOT paraphrase, abbreviate, reword, or create synonyms. For example, if the category is "Water supply", NEVER write "Water", "Water issues", "Water supply problems", or any variation.
-2. Two responses that express the same idea MUST receive the same category, even if they use different words. For example, "water is bad", "we need clean water", and "water supply is poor" should ALL get the same water-related category.
-3. When in doubt between two categories, choose the one that is MORE SPECIFIC to the response content.
-4. If a response does not clearly fit any category, assign it to "Other". Prefer "Other" over inventing new categories.
-5. If the response is empty, output: 999
-6. ONLY use "NEW: <short category name>" if the response represents a genuinely distinct theme that NONE of the existing categories can cover — this should be extremely rare.
-7. The output must be in {language}, even if the answers are in other languages.
-8. Output ONLY the category name per line — no explanation, no punctuation, no extra text.
-
-Responses (one per line, numbered):
-{responses}
-
-Output one category per line in the same order (numbered to match), e.g.:
-1. Category
-2. Category
-..."""
-
 # ── Session state ─────────────────────────────────────────────────────────────
 if "question_categories" not in st.session_state:
     st.session_state.question_categories = {}
@@ -252,10 +196,10 @@ Rules:
 7. Do not create a category unless at least 2 responses clearly belong to it."""
 
                     try:
-                        suggest_model = genai.GenerativeModel(model_name)
+                        suggest_model = generative_model(model_name)
                         resp = suggest_model.generate_content(
                             suggest_prompt,
-                            generation_config=genai.types.GenerationConfig(temperature=0.3, max_output_tokens=1024),
+                            generation_config=generation_config(temperature=0.3, max_output_tokens=1024),
                         )
                         suggested = resp.text.strip()
                         # Clean numbered prefixes if model adds them
@@ -304,220 +248,72 @@ if df is not None and question_cols:
 
     if run_btn:
         model_id = f"models/{model_name}"
-        gemini_model = genai.GenerativeModel(model_name)
+        gemini_model = generative_model(model_name)
         result_df = df.copy()
         token_counts = {"input": 0, "output": 0}
 
-        import time
-
-        MAX_RETRIES = 3
-
-        def call_gemini_batch(prompt_text: str) -> tuple[str, int, int]:
-            """Returns (text, input_tokens, output_tokens) with retry."""
-            for attempt in range(MAX_RETRIES):
-                try:
-                    response = gemini_model.generate_content(
-                        prompt_text,
-                        generation_config=genai.types.GenerationConfig(
-                            max_output_tokens=4096,
-                            temperature=0,
-                        ),
-                        request_options={"timeout": 120},
-                    )
-                    in_tok = response.usage_metadata.prompt_token_count
-                    out_tok = response.usage_metadata.candidates_token_count
-                    return response.text.strip(), in_tok, out_tok
-                except Exception as e:
-                    if attempt < MAX_RETRIES - 1:
-                        wait = 2 ** attempt
-                        st.toast(f"Retry {attempt+1}/{MAX_RETRIES} pas {wait}s: {e}")
-                        time.sleep(wait)
-                    else:
-                        raise e
-
-        def parse_batch_response(text: str, expected_count: int) -> list[str]:
-            """Parse numbered lines from model output. Handles multi-word categories."""
-            lines = [l.strip() for l in text.strip().splitlines() if l.strip()]
-            results = []
-            for line in lines:
-                # Match lines starting with a number (e.g. "1. Category name here")
-                m = re.match(r"^\d+[\.\)\-:]\s*(.+)$", line)
-                if m:
-                    results.append(m.group(1).strip())
-                elif not re.match(r"^\d+$", line):
-                    # Non-numbered, non-empty line — include as-is (fallback)
-                    results.append(line.strip())
-            # Pad or truncate to match expected count
-            while len(results) < expected_count:
-                results.append("Error")
-            return results[:expected_count]
-
-        def categorize_column(col: str, categories: list[str], responses: pd.Series) -> list[str]:
-            cats_str = "\n".join(f"- {c}" for c in categories)
-
-            # Pre-fill results: mark nulls/empty as 999 immediately
-            results = [""] * len(responses)
-            non_empty_indices = []
-            for i, resp in enumerate(responses):
-                if pd.isna(resp) or str(resp).strip() == "":
-                    results[i] = "999"
-                else:
-                    non_empty_indices.append(i)
-
-            if not non_empty_indices:
-                return results
-
-            # --- Deduplication: categorize each unique response text only once ---
+        def categorize(col, categories, responses):
             followup_info = st.session_state.question_followup.get(col)
-
-            # Build a key for each response (includes parent answer for follow-ups)
-            def make_key(idx):
-                resp_text = str(responses.iloc[idx]).strip()
-                if followup_info:
-                    parent_val = df[followup_info["column"]].iloc[idx]
-                    if pd.isna(parent_val) or str(parent_val).strip() == "":
-                        parent_answer = "(no answer)"
-                    else:
-                        parent_answer = str(parent_val).strip()
-                    return f"[{parent_answer}] {resp_text}"
-                return resp_text
-
-            # Map each unique key to the list of row indices that share it
-            unique_keys = OrderedDict()
-            for idx in non_empty_indices:
-                key = make_key(idx)
-                if key not in unique_keys:
-                    unique_keys[key] = {"idx": idx, "rows": []}
-                unique_keys[key]["rows"].append(idx)
-
-            unique_list = list(unique_keys.items())  # [(key, {"idx": ..., "rows": [...]}), ...]
-            total_unique = len(unique_list)
-            total_original = len(non_empty_indices)
-            deduped = total_original - total_unique
-            skipped = len(responses) - total_original
-
-            num_batches = (total_unique + batch_size - 1) // batch_size
-            prog = st.progress(0, text=f"Duke kategorizuar **{col}** ({total_unique} unik nga {total_original} përgjigje, {deduped} dublikatë, {skipped} bosh)…")
-
-            unique_labels = [""] * total_unique
-
-            for batch_idx in range(num_batches):
-                start = batch_idx * batch_size
-                end = min(start + batch_size, total_unique)
-                batch_items = unique_list[start:end]
-
-                numbered_responses = []
-                for j, (key, info) in enumerate(batch_items):
-                    idx = info["idx"]
-                    resp_text = str(responses.iloc[idx])
-                    if followup_info:
-                        parent_val = df[followup_info["column"]].iloc[idx]
-                        if pd.isna(parent_val) or str(parent_val).strip() == "":
-                            parent_answer = "(no answer)"
-                        else:
-                            parent_answer = str(parent_val)
-                        numbered_responses.append(f"{j+1}. [Previous answer: {parent_answer}] {resp_text}")
-                    else:
-                        numbered_responses.append(f"{j+1}. {resp_text}")
-
-                question_label = st.session_state.question_labels.get(col, col)
-                if followup_info:
-                    question_label = f"{question_label}\n(This is a follow-up to: \"{followup_info['label']}\" — each response includes the respondent's previous answer in [brackets] for context.)"
-
-                prompt = st.session_state.prompt_template.format(
-                    question_label=question_label,
-                    categories=cats_str,
-                    responses="\n".join(numbered_responses),
-                    language=st.session_state.language,
-                )
-
-                try:
-                    text, in_tok, out_tok = call_gemini_batch(prompt)
-                    token_counts["input"] += in_tok
-                    token_counts["output"] += out_tok
-                    batch_labels = parse_batch_response(text, len(batch_items))
-                except Exception as e:
-                    st.warning(f"Gabim API në batch {batch_idx+1}: {e}")
-                    batch_labels = ["Error"] * len(batch_items)
-
-                for j in range(len(batch_items)):
-                    unique_labels[start + j] = batch_labels[j]
-
-                prog.progress(end / total_unique, text=f"Duke kategorizuar **{col}** ({end}/{total_unique} unik)")
-
-            # --- Map labels back: every duplicate row gets the same category ---
-            for i, (key, info) in enumerate(unique_list):
-                label = unique_labels[i]
-                for row_idx in info["rows"]:
-                    results[row_idx] = label
-
+            prog = st.progress(0, text=f"Duke kategorizuar **{col}**…")
+
+            def on_start(total_unique, total_original, deduped, skipped):
+                prog.progress(0, text=f"Duke kategorizuar **{col}** ({total_unique} unik nga {total_original} përgjigje, {deduped} dublikatë, {skipped} bosh)…")
+
+            labels = categorize_column(
+                responses,
+                categories,
+                gemini_model,
+                st.session_state.prompt_template,
+                st.session_state.question_labels.get(col, col),
+                st.session_state.language,
+                batch_size,
+                parent_responses=df[followup_info["column"]] if followup_info else None,
+                parent_label=followup_info["label"] if followup_info else None,
+                token_counts=token_counts,
+                on_start=on_start,
+                on_progress=lambda done, total: prog.progress(done / total, text=f"Duke kategorizuar **{col}** ({done}/{total} unik)"),
+                on_warning=lambda batch_no, e: st.warning(f"Gabim API në batch {batch_no}: {e}"),
+                on_retry=lambda attempt, wait, e: st.toast(f"Retry {attempt}/{MAX_RETRIES} pas {wait}s: {e}"),
+            )
             prog.empty()
-            return results
+            return labels
 
         for col in question_cols:
             base_cats = [c.strip() for c in st.session_state.question_categories[col].splitlines() if c.strip()]
 
             with st.spinner(f"Duke procesuar **{col}**…"):
-                labels = categorize_column(col, base_cats, df[col])
+                labels = categorize(col, base_cats, df[col])
 
             # Detect high-frequency NEW categories
-            new_labels = [l for l in labels if l.lower().startswith("new:")]
-            new_counts = Counter(re.sub(r"(?i)^new:\s*", "", l).strip() for l in new_labels)
-            promoted = [cat for cat, cnt in new_counts.items() if cnt >= new_cat_threshold]
+            promoted = promoted_categories(labels, new_cat_threshold)
 
             if promoted:
                 st.info(f"Kategori të reja të detektuara për **{col}**: {', '.join(promoted)} — duke ri-ekzekutuar me listën e përditësuar…")
                 updated_cats = base_cats + promoted
                 # Only re-categorize responses that were tagged as NEW:
-                new_indices = [i for i, l in enumerate(labels) if l.lower().startswith("new:")]
+                new_indices = [i for i, l in enumerate(labels) if is_new_label(l)]
                 if new_indices:
                     # Build a series with only the NEW-tagged responses, rest as NaN
                     partial_series = pd.Series([None] * len(df[col]), dtype=object)
                     for i in new_indices:
                         partial_series.iloc[i] = df[col].iloc[i]
-                    partial_labels = categorize_column(col, updated_cats, partial_series)
+                    partial_labels = categorize(col, updated_cats, partial_series)
                     # Merge: only replace labels that were NEW:
                     for i in new_indices:
                         labels[i] = partial_labels[i]
 
-            # Clean up any remaining "NEW: X" labels
-            def clean_label(l):
-                m = re.match(r"(?i)^new:\s*(.+)$", l)
-                return m.group(1).strip() if m else l
-
-            labels = [clean_label(l) for l in labels]
-
-            # Normalize categories: strip trailing punctuation, then merge duplicates
-            # e.g. "Electricity." → "Electricity", deduped against "Electricity"
-            def normalize_label(l):
-                if l in ("999", "Error"):
-                    return l
-                return l.rstrip(".")
-
-            labels = [normalize_label(l) for l in labels]
-
-            # Build a canonical mapping: for each lowercased name, keep the first seen form
-            canonical = {}
-            for l in labels:
-                if l in ("999", "Error"):
-                    continue
-                key = l.lower()
-                if key not in canonical:
-                    canonical[key] = l
-            labels = [canonical.get(l.lower(), l) if l not in ("999", "Error") else l for l in labels]
+            labels = normalize_labels(labels)
 
             # Consolidate: keep top (max_categories - 1) categories, merge rest into "Other"
-            label_counts = Counter(l for l in labels if l not in ("999", "Error"))
-            if len(label_counts) > max_categories:
-                top_cats = {cat for cat, _ in label_counts.most_common(max_categories - 1)}
-                merged_count = sum(cnt for cat, cnt in label_counts.items() if cat not in top_cats)
-                st.info(f"**{col}**: {len(label_counts)} kategori u gjetën → duke bashkuar {len(label_counts) - len(top_cats)} kategori me frekuencë të ulët ({merged_count} përgjigje) në 'Other'")
-                labels = [l if l in top_cats or l in ("999", "Error") else "Other" for l in labels]
+            labels, merge = consolidate_labels(labels, max_categories)
+            if merge:
+                found, merged_cats, merged_count = merge
+                st.info(f"**{col}**: {found} kategori u gjetën → duke bashkuar {merged_cats} kategori me frekuencë të ulët ({merged_count} përgjigje) në 'Other'")
 
             result_df[f"{col}_grouped"] = labels
 
         # ── Cost calculation ─────────────────────────────────────────────────
-        total_cost = calculate_gemini_cost(token_counts["input"], token_counts["output"], model_id)
+        total_cost = calculate_gemini_cost(token_counts["input"], token_counts["output"], model_id, default_model="models/gemini-2.5-pro")
 
         # Store results in session state so they persist across reruns
         output = io.BytesIO()